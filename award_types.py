@@ -0,0 +1,42 @@
+import hashlib
+import records
+from records import BadgeRecord
+
+# Badge look for award types not listed below
+DEFAULT_EMOJI = '🏆'
+DEFAULT_COLOR = 'bg-gray-300 text-gray-800 border-gray-200'
+
+def _badge(award_type, emoji, color):
+    return BadgeRecord(award_type, emoji, color, award_type.replace('_', ' ').title())
+
+# Every weekly award in display order; the single source of badge metadata
+AWARD_TYPES = [
+    _badge('weekly_champion', '👑', 'bg-yellow-400 text-white border-yellow-300'),
+    _badge('wooden_spoon', '🥄', 'bg-red-500 text-white border-red-300'),
+    _badge('performance_of_week', '🚀', 'bg-indigo-500 text-white border-indigo-300'),
+    _badge('the_wall', '🧱', 'bg-green-500 text-white border-green-300'),
+    _badge('benchwarmer', '🪑', 'bg-purple-500 text-white border-purple-300'),
+    _badge('captain_fantastic', '⭐', 'bg-slate-800 text-white border-slate-600')
+]
+AWARD_TYPE_CODES = [badge.type for badge in AWARD_TYPES]
+
+_badges = {badge.type: badge for badge in AWARD_TYPES}
+
+def badge_for(award_type):
+    """Shared badge record for an award type (a generic one for unknown types)."""
+    badge = _badges.get(award_type)
+    if badge is None:
+        badge = BadgeRecord(award_type, DEFAULT_EMOJI, DEFAULT_COLOR, award_type.replace('_', ' ').title())
+        _badges[award_type] = badge
+    return badge
+
+# Changes whenever the metadata does, so clients can cache /api/award-types?v=<version> forever
+AWARD_TYPES_VERSION = hashlib.sha1(records.dumps(AWARD_TYPES).encode('utf-8')).hexdigest()[:12]
+
+def award_types_payload():
+    """Body of /api/award-types."""
+    return {
+        'version': AWARD_TYPES_VERSION,
+        'types': AWARD_TYPES,
+        'default': {'emoji': DEFAULT_EMOJI, 'color': DEFAULT_COLOR}
+    }
@@ -230,7 +230,7 @@ class AwardsCalculator:
     
     def _check_player_data_availability(self, gameweek):
         """Check if player performance data is available for a gameweek."""
-        with db_manager.get_connection() as conn:
+        with db_manager.get_read_connection() as conn:
             c = conn.cursor()
             c.execute('''SELECT COUNT(*) FROM player_performance WHERE gameweek = ?''', (gameweek,))
             count = c.fetchone()[0]
@@ -238,7 +238,7 @@ class AwardsCalculator:
     
     def _get_team_detailed_data(self, team_id, gameweek):
         """Get detailed team data from database."""
-        with db_manager.get_connection() as conn:
+        with db_manager.get_read_connection() as conn:
             c = conn.cursor()
             c.execute('''SELECT player_id, player_name, position, element_type, 
                                 gw_points, is_captain, chips_used
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Aggregate Consistency Check
+===========================
+
+Checks that every incrementally maintained table matches a full rebuild
+after saves and snapshot rollbacks: standings, player ownership, the
+season award tally, league records and the team search index. The
+in-memory read model's /api/data and /api/awards bodies are compared
+with a freshly loaded one as well.
+
+Everything runs on a temporary copy of the database, so the original is
+never written to.
+
+Usage: python check_aggregates.py [path/to/fpl_history.db]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+# Derived tables and the order their rows are compared in
+AGGREGATES = {
+    'standings': 'SELECT * FROM standings ORDER BY gameweek, team_id',
+    'player_ownership': 'SELECT * FROM player_ownership ORDER BY gameweek, element',
+    'award_tally': 'SELECT * FROM award_tally ORDER BY team_id, award_type',
+    'league_records': 'SELECT * FROM league_records ORDER BY record',
+    'league_records_state': 'SELECT * FROM league_records_state ORDER BY gameweek',
+    # Search rows are compared by content; rowids change when the index is rebuilt
+    'team_search': '''SELECT n.team_id, n.team_name, n.manager_name, n.first_gameweek,
+                             n.last_gameweek, s.names
+                      FROM team_names n JOIN team_search s ON s.rowid = n.rowid
+                      ORDER BY n.team_id, n.team_name, n.manager_name'''
+}
+
+def read_aggregates(c):
+    """Current rows of every derived table."""
+    rows = {}
+    for table, query in AGGREGATES.items():
+        c.execute(query)
+        rows[table] = c.fetchall()
+    return rows
+
+def rebuild_aggregates(db_manager, league_records, c):
+    """Recompute every derived table from the source tables in the caller's transaction."""
+    c.execute('DELETE FROM standings')
+    c.execute('SELECT DISTINCT gameweek FROM fpl_data')
+    for (gameweek,) in c.fetchall():
+        db_manager._refresh_standings(c, gameweek)
+    c.execute('DELETE FROM player_ownership')
+    c.execute('SELECT DISTINCT gameweek FROM player_performance')
+    for (gameweek,) in c.fetchall():
+        db_manager._rebuild_ownership(c, gameweek)
+    db_manager._rebuild_award_tally(c)
+    db_manager._rebuild_team_search(c)
+    c.execute('DELETE FROM league_records_state')
+    league_records.update(c, 1)
+
+def read_views(read_model, gameweeks):
+    """Served bodies of every gameweek plus the season leaderboard."""
+    views = {}
+    for gameweek in gameweeks:
+        views[('data', gameweek)] = read_model.get_gameweek_body(gameweek)
+        views[('compact', gameweek)] = read_model.get_gameweek_body(gameweek, compact=True)
+        views[('awards', gameweek)] = read_model.get_awards_body(gameweek)
+    views['season'] = read_model.get_season_awards_response().body
+    return views
+
+def check(label, modules):
+    """Compare incremental state with a rebuild; return the number of mismatches."""
+    db_manager, league_records, read_model, ReadModel = modules
+    failures = 0
+
+    with db_manager.get_connection() as conn:
+        c = conn.cursor()
+        c.execute("INSERT INTO team_search (team_search) VALUES ('integrity-check')")
+        incremental = read_aggregates(c)
+        rebuild_aggregates(db_manager, league_records, c)
+        rebuilt = read_aggregates(c)
+        conn.rollback()
+    for table in AGGREGATES:
+        if incremental[table] != rebuilt[table]:
+            failures += 1
+            print(f"  MISMATCH {label}: {table} differs from a full rebuild "
+                  f"({len(incremental[table])} vs {len(rebuilt[table])} rows)")
+
+    # A fresh read model loads everything from the published snapshot
+    fresh = ReadModel()
+    db_manager._listeners.remove(fresh._on_database_change)
+    gameweeks = db_manager.get_available_gameweeks()
+    served = read_views(read_model, gameweeks)
+    loaded = read_views(fresh, gameweeks)
+    for key in served:
+        if served[key] != loaded[key]:
+            failures += 1
+            print(f"  MISMATCH {label}: read model view {key} differs from a fresh load")
+
+    print(f"{'OK' if not failures else 'FAILED'}: {label}")
+    return failures
+
+def edit_gameweek(db_manager, gameweek):
+    """Save changed standings, awards and picks for a gameweek."""
+    teams = db_manager.get_fpl_data(gameweek)
+    changed = [dict(team) for team in teams]
+    # Renaming the leader and moving the last team to the top changes ranks, names and records
+    changed[0]['team_name'] += ' (renamed)'
+    changed[-1]['gw_points'] += 200
+    changed[-1]['total_points'] += 200
+    db_manager.save_fpl_data(gameweek, changed)
+
+    db_manager.save_award_winners(gameweek, {
+        'gw_winner': [{'team_id': changed[-1]['team_id'], 'team_name': changed[-1]['team_name'],
+                       'manager_name': changed[-1]['manager_name'], 'points': changed[-1]['gw_points']}]
+    })
+
+    with db_manager.get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''SELECT team_id, player_id, player_name, position, element_type, gw_points,
+                            is_captain, chips_used
+                     FROM player_performance WHERE gameweek = ? ORDER BY team_id, position''', (gameweek,))
+        rows = c.fetchall()
+    if rows:
+        team_id = rows[0][0]
+        # Hand the armband to the first pick and double its points
+        players = [{
+            'player_id': row[1], 'player_name': row[2], 'position': row[3], 'element_type': row[4],
+            'gw_points': row[5] * 2 if i == 0 else row[5], 'is_captain': i == 0, 'chips_used': row[7]
+        } for i, row in enumerate(r for r in rows if r[0] == team_id)]
+        db_manager.save_player_performance(gameweek, team_id, players)
+
+def main():
+    source = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else 'fpl_history.db')
+    if not os.path.exists(source):
+        print(f"Database not found: {source}")
+        sys.exit(1)
+
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    work_dir = tempfile.mkdtemp(prefix='fpl-check-')
+    try:
+        shutil.copy(source, os.path.join(work_dir, 'fpl_history.db'))
+        # The app uses paths relative to the working directory; point them at the copy
+        os.chdir(work_dir)
+        os.environ['DATABASE_PATH'] = 'fpl_history.db'
+        os.environ['SNAPSHOT_DIR'] = 'snapshots'
+        os.environ['SNAPSHOT_KEEP'] = '10'
+        sys.path.insert(0, project_dir)
+
+        from database_manager import db_manager
+        from league_records import league_records
+        from read_model import read_model, ReadModel
+        modules = (db_manager, league_records, read_model, ReadModel)
+
+        read_model.ensure_loaded()
+        gameweeks = db_manager.get_available_gameweeks()
+        if len(gameweeks) < 2:
+            print("Need at least two gameweeks of data to check")
+            sys.exit(1)
+        latest, previous = gameweeks[-1], gameweeks[-2]
+
+        failures = check('initial data', modules)
+        initial = read_views(read_model, gameweeks)
+
+        # Two staged batches and one standalone write: three snapshots to roll back
+        with db_manager.staging():
+            edit_gameweek(db_manager, previous)
+        failures += check(f'after staged edit of gameweek {previous}', modules)
+        with db_manager.staging():
+            edit_gameweek(db_manager, latest)
+        failures += check(f'after staged edit of gameweek {latest}', modules)
+        db_manager.save_award_winners(latest, {})
+        failures += check(f'after clearing gameweek {latest} awards', modules)
+
+        for step in (1, 2, 3):
+            restored = db_manager.rollback_snapshot()
+            if restored is None:
+                failures += 1
+                print(f"  MISMATCH rollback {step}: nothing to roll back to")
+            failures += check(f'after rollback {step}', modules)
+
+        if read_views(read_model, gameweeks) != initial:
+            failures += 1
+            print("  MISMATCH: served data after every rollback differs from the initial data")
+
+        print()
+        if failures:
+            print(f"{failures} mismatch(es) found")
+            sys.exit(1)
+        print("All aggregates match a full rebuild")
+    finally:
+        os.chdir(project_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import gzip
+import threading
+import zlib
+import records
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def supported_encodings():
+    """Content codings we can produce, most preferred first."""
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+def negotiate(accept_encoding):
+    """Pick a content coding from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    for coding in supported_encodings():
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+def variant_etag(etag, encoding):
+    """Strong ETag of one content coding of a response: '"abc"' becomes '"abc-gzip"'."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+def compress(body, encoding):
+    """Compress bytes with a negotiated coding (None returns them unchanged)."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(body, compresslevel=Config.GZIP_LEVEL, mtime=0)
+    return body
+
+class CachedResponse:
+    """A shared JSON payload with its encoded body and compressed variants.
+
+    The payload is encoded the first time it is sent and each coding is
+    compressed at most once, so a hot response costs a dictionary lookup
+    per request. The payload must not be modified once created.
+    """
+    __slots__ = ('payload', '_body', '_variants', '_lock')
+
+    def __init__(self, payload):
+        self.payload = payload
+        self._body = None
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = records.dumps(self.payload).encode('utf-8')
+        return self._body
+
+    def encoded(self, encoding):
+        """Body in the given coding (None for identity), compressing once."""
+        if encoding is None:
+            return self.body
+        variant = self._variants.get(encoding)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(encoding)
+                if variant is None:
+                    variant = compress(self.body, encoding)
+                    self._variants[encoding] = variant
+        return variant
+
+class StreamCompressor:
+    """Compress a body written in pieces with a negotiated coding (None passes data through)."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=Config.BROTLI_QUALITY)
+        elif encoding == 'gzip':
+            # wbits=31 writes a gzip header (with mtime 0) and trailer
+            self._compressor = zlib.compressobj(Config.GZIP_LEVEL, zlib.DEFLATED, 31)
+        else:
+            self._compressor = None
+
+    def compress(self, data):
+        """Compressed output for the next piece; may be empty while the compressor buffers."""
+        if self._compressor is None:
+            return data
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self):
+        """Remaining output once the last piece has been written."""
+        if self._compressor is None:
+            return b''
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
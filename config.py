@@ -17,6 +17,10 @@ class Config:
     # Database configuration
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'fpl_history.db')
     
+    # Read-only snapshots that request handlers read from, and how many to keep for rollback
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+    SNAPSHOT_KEEP = int(os.getenv('SNAPSHOT_KEEP', 5))
+    
     # API base URLs
     if IS_PRODUCTION:
         # Production (Render) - will be set by environment variable
@@ -31,6 +35,46 @@ class Config:
     # Cache settings
     CACHE_DURATION_HOURS = 24
     
+    # Retry-After for /api/live while the leader is still caching the gameweek's picks
+    LIVE_WARMING_RETRY_SECONDS = int(os.getenv('LIVE_WARMING_RETRY_SECONDS', 30))
+    
+    # Gameweek resolver: how long cached event state stays valid
+    GAMEWEEK_LIVE_TTL_SECONDS = 300      # while a gameweek is in progress
+    GAMEWEEK_MAX_TTL_SECONDS = 6 * 3600  # between gameweeks
+    GAMEWEEK_RETRY_SECONDS = 60          # after a failed bootstrap fetch
+    
+    # Refresh scheduler timings
+    PICKS_DELAY_SECONDS = 30 * 60        # picks are published shortly after the deadline
+    MATCH_WINDOW_MINUTES = 120           # kickoff to final whistle, with margin
+    LIVE_REFRESH_SECONDS = 5 * 60        # live points polling during a match window
+    BONUS_DELAY_SECONDS = 60 * 60        # bonus points are usually confirmed within an hour
+    SCHEDULER_RETRY_SECONDS = 5 * 60
+    SCHEDULER_MAX_SLEEP_SECONDS = 6 * 3600
+    
+    # Response compression: JSON bodies smaller than this are sent as-is
+    COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5
+    
+    # Paginated standings (/api/standings/{gameweek})
+    STANDINGS_PAGE_SIZE = 50
+    STANDINGS_MAX_PAGE_SIZE = 500
+    
+    # Name search (/api/search?q=)
+    SEARCH_LIMIT = 10
+    SEARCH_MAX_LIMIT = 50
+    
+    # Serve index.html with the current gameweek's data embedded (false = plain static page)
+    PRERENDER_INDEX = os.getenv('PRERENDER_INDEX', 'true').lower() == 'true'
+    
+    # Pre-fork serving: number of worker processes sharing the port (1 = single process)
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', 1))
+    WORKER_GRACEFUL_TIMEOUT = int(os.getenv('WORKER_GRACEFUL_TIMEOUT', 10))
+    
+    # Multi-process deployments: refresh leadership lease and change polling
+    LEADER_LEASE_SECONDS = int(os.getenv('LEADER_LEASE_SECONDS', 60))
+    DATA_VERSION_POLL_SECONDS = int(os.getenv('DATA_VERSION_POLL_SECONDS', 5))
+    
     @classmethod
     def get_api_url(cls, endpoint):
         """Get full API URL for an endpoint."""
@@ -47,6 +91,7 @@ class Config:
         print(f"Host: {cls.HOST}")
         print(f"API Base URL: {cls.API_BASE_URL}")
         print(f"Database: {cls.DATABASE_PATH}")
+        print(f"Web workers: {cls.WEB_WORKERS}")
         print(f"League ID: {cls.FPL_LEAGUE_ID}")
         print("=============================")
 
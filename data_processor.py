@@ -1,4 +1,5 @@
 from database_manager import db_manager
+from award_types import badge_for, AWARD_TYPE_CODES
 
 class DataProcessor:
     def __init__(self):
@@ -83,7 +84,7 @@ class DataProcessor:
         print(f"Awards: {list(awards.keys())}")
         
         # Ensure all award types exist (even if empty)
-        for award_type in ['weekly_champion', 'wooden_spoon', 'performance_of_week', 'the_wall', 'benchwarmer', 'captain_fantastic']:
+        for award_type in AWARD_TYPE_CODES:
             if award_type not in awards:
                 awards[award_type] = []
         
@@ -98,33 +99,11 @@ class DataProcessor:
                 team_award_map.setdefault(tid, []).append(award_type)
                 print(f"Added award {award_type} to team {tid}")
         
-        add_award(team_id_to_awards, awards.get('weekly_champion'), 'weekly_champion')
-        add_award(team_id_to_awards, awards.get('wooden_spoon'), 'wooden_spoon')
-        add_award(team_id_to_awards, awards.get('performance_of_week'), 'performance_of_week')
-        add_award(team_id_to_awards, awards.get('the_wall'), 'the_wall')
-        add_award(team_id_to_awards, awards.get('benchwarmer'), 'benchwarmer')
-        add_award(team_id_to_awards, awards.get('captain_fantastic'), 'captain_fantastic')
+        for award_type in AWARD_TYPE_CODES:
+            add_award(team_id_to_awards, awards.get(award_type), award_type)
         
         print(f"Team ID to awards mapping: {team_id_to_awards}")
         
-        # Helper mappings for badge metadata
-        award_emojis = {
-            'weekly_champion': '👑',
-            'wooden_spoon': '🥄',
-            'performance_of_week': '🚀',
-            'the_wall': '🧱',
-            'benchwarmer': '🪑',
-            'captain_fantastic': '⭐'
-        }
-        award_colors = {
-            'weekly_champion': 'bg-yellow-400 text-white border-yellow-300',
-            'wooden_spoon': 'bg-red-500 text-white border-red-300',
-            'performance_of_week': 'bg-indigo-500 text-white border-indigo-300',
-            'the_wall': 'bg-green-500 text-white border-green-300',
-            'benchwarmer': 'bg-purple-500 text-white border-purple-300',
-            'captain_fantastic': 'bg-slate-800 text-white border-slate-600'
-        }
-        
         # Attach awards to each team
         for team in teams:
             awards_for_team = []
@@ -132,12 +111,8 @@ class DataProcessor:
             print(f"Team {team['team_name']} (ID: {team['team_id']}) has awards: {team_awards}")
             
             for a_type in team_awards:
-                awards_for_team.append({
-                    'type': a_type,
-                    'emoji': award_emojis.get(a_type, '🏆'),
-                    'color': award_colors.get(a_type, 'bg-gray-300 text-gray-800 border-gray-200'),
-                    'text': a_type.replace('_', ' ').title()
-                })
+                # Badges are shared records, serialized with records.dumps
+                awards_for_team.append(badge_for(a_type))
             
             team['awards'] = awards_for_team
             print(f"  Final awards for {team['team_name']}: {len(awards_for_team)} awards")
@@ -173,7 +148,7 @@ class DataProcessor:
             awards = db_manager.get_awards(gameweek)
             
             # Ensure all award types exist (even if empty)
-            for award_type in ['weekly_champion', 'wooden_spoon', 'performance_of_week', 'the_wall', 'benchwarmer', 'captain_fantastic']:
+            for award_type in AWARD_TYPE_CODES:
                 if award_type not in awards:
                     awards[award_type] = []
             
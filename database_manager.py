@@ -1,14 +1,72 @@
 import sqlite3
 import os
+import records
+import re
+import threading
+import time
+import unicodedata
 from contextlib import contextmanager
+from snapshot_store import SnapshotStore
+from league_records import league_records
+
+# Tables whose contents are restored when a snapshot is rolled back
+DATA_TABLES = ['fpl_data', 'award_winners', 'player_performance']
+
+# Sort keys of the paginated standings and their (indexed) columns, all descending
+STANDINGS_SORTS = {
+    'total': 'total_points',
+    'gw': 'gw_points',
+    'rank_change': 'rank_change',
+    'value': 'team_value'
+}
+
+# Each stored pick with its starter/captain flags and points multiplier: bench 0 (1 with
+# Bench Boost), starter 1, captain 2, triple captain 3
+_PICK_MULTIPLIERS = '''SELECT gameweek, team_id, player_id, player_name, element_type, gw_points,
+                             CASE WHEN position <= 11 OR chips_used = 'bboost' THEN 1 ELSE 0 END AS starter,
+                             CASE WHEN is_captain THEN 1 ELSE 0 END AS captain,
+                             CASE WHEN is_captain AND chips_used = '3xc' THEN 1 ELSE 0 END AS triple_captain,
+                             CASE WHEN is_captain AND chips_used = '3xc' THEN 3
+                                  WHEN is_captain THEN 2
+                                  WHEN position <= 11 OR chips_used = 'bboost' THEN 1
+                                  ELSE 0 END AS multiplier
+                      FROM player_performance'''
+
+# Letters that do not decompose under NFKD, spelled the way people type them without the key
+_FOLD_LETTERS = str.maketrans({'æ': 'ae', 'ø': 'o', 'å': 'a', 'ß': 'ss', 'đ': 'd', 'ł': 'l', 'þ': 'th'})
+
+def fold_name(text):
+    """Lowercase text with diacritics removed, so 'Lærum' and 'laerum' match."""
+    text = unicodedata.normalize('NFKD', (text or '').lower().translate(_FOLD_LETTERS))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+def search_match(text):
+    """FTS5 query matching names with words starting with every word of text, or None if it has none."""
+    terms = re.findall(r'\w+', fold_name(text))
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
 
 class DatabaseManager:
     def __init__(self, db_path='fpl_history.db'):
         self.db_path = db_path
-        self.init_database()
+        self._listeners = []
+        self._changes_lock = threading.Lock()
+        self._local_versions = set()
+        self._local = threading.local()
+        # Held by the outermost staging() block and by every publish, so a snapshot
+        # never captures another thread's half-finished ingest
+        self._publish_lock = threading.RLock()
+        self._unpublished = []
+        self._records_from = None   # earliest gameweek of a failed league records replay
+        self.snapshots = SnapshotStore(db_path)
+        backfilled = self.init_database()
+        if backfilled or self.snapshots.current_name() is None or self.get_data_version() < self._staging_version():
+            self.snapshots.publish()
+        self._seen_version = self.get_data_version()
     
     def init_database(self):
-        """Initialize the database with required tables."""
+        """Initialize the database with required tables; True if derived tables were backfilled."""
         with self.get_connection() as conn:
             c = conn.cursor()
             
@@ -67,7 +125,102 @@ class DatabaseManager:
                               gw_points INTEGER, is_captain BOOLEAN, chips_used TEXT,
                               PRIMARY KEY (gameweek, team_id, player_id))''')
             
+            # Change log: every write bumps the data version so other processes can follow
+            c.execute('''CREATE TABLE IF NOT EXISTS data_changes
+                         (version INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT,
+                          gameweek INTEGER, changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+            
+            # Leadership lease so only one process runs the refresh scheduler
+            c.execute('''CREATE TABLE IF NOT EXISTS leader_lease
+                         (name TEXT PRIMARY KEY, holder TEXT, expires_at REAL)''')
+            
+            # Provisional live standings written by the leader's scheduler; every process serves
+            # them from here, read from the main database since each poll is not published
+            c.execute('''CREATE TABLE IF NOT EXISTS live_standings
+                         (gameweek INTEGER PRIMARY KEY, payload TEXT, updated_at REAL)''')
+            
+            # Materialized standings (ranks, rank changes, award flag) kept in step with
+            # fpl_data and award_winners, with an index per sort key for keyset paging
+            c.execute('PRAGMA table_info(standings)')
+            column_types = {row[1]: row[2] for row in c.fetchall()}
+            if column_types and (column_types.get('team_value') != 'REAL' or column_types.get('bank_balance') != 'REAL'):
+                # Older tables declared value and bank INTEGER; drop it so it is rebuilt below
+                print("Recreating standings with REAL team_value/bank_balance columns")
+                c.execute('DROP TABLE standings')
+            c.execute('''CREATE TABLE IF NOT EXISTS standings
+                         (gameweek INTEGER, team_id INTEGER, team_name TEXT, manager_name TEXT,
+                          gw_points INTEGER, total_points INTEGER, team_value REAL,
+                          bank_balance REAL, overall_rank INTEGER, rank_change INTEGER,
+                          has_award INTEGER,
+                          PRIMARY KEY (gameweek, team_id))''')
+            for sort, column in STANDINGS_SORTS.items():
+                c.execute(f'''CREATE INDEX IF NOT EXISTS idx_standings_{sort}
+                              ON standings (gameweek, {column} DESC, team_id)''')
+            
+            # Every team/manager name seen in any gameweek, with a full-text index over
+            # the folded names (rowids match) for prefix search
+            c.execute('''CREATE TABLE IF NOT EXISTS team_names
+                         (team_id INTEGER, team_name TEXT, manager_name TEXT,
+                          first_gameweek INTEGER, last_gameweek INTEGER,
+                          UNIQUE (team_id, team_name, manager_name))''')
+            c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS team_search
+                         USING fts5(names, tokenize = 'unicode61 remove_diacritics 2')''')
+            
+            backfilled = False
+            c.execute('SELECT EXISTS (SELECT 1 FROM team_names)')
+            if not c.fetchone()[0]:
+                backfilled = self._rebuild_team_search(c)
+                if backfilled:
+                    print("Indexed team and manager names for search")
+            
+            c.execute('SELECT EXISTS (SELECT 1 FROM standings)')
+            if not c.fetchone()[0]:
+                c.execute('SELECT DISTINCT gameweek FROM fpl_data')
+                gameweeks = [row[0] for row in c.fetchall()]
+                for gameweek in gameweeks:
+                    self._refresh_standings(c, gameweek)
+                if gameweeks:
+                    backfilled = True
+                    print("Materialized standings for existing gameweeks")
+            
+            # League-wide ownership per gameweek and player, kept in step with player_performance
+            c.execute('''CREATE TABLE IF NOT EXISTS player_ownership
+                         (gameweek INTEGER, element INTEGER, player_name TEXT, element_type INTEGER,
+                          owners INTEGER, starters INTEGER, captains INTEGER, triple_captains INTEGER,
+                          multiplier_total INTEGER, points INTEGER,
+                          PRIMARY KEY (gameweek, element))''')
+            c.execute('SELECT EXISTS (SELECT 1 FROM player_ownership)')
+            if not c.fetchone()[0]:
+                c.execute('SELECT DISTINCT gameweek FROM player_performance')
+                gameweeks = [row[0] for row in c.fetchall()]
+                for gameweek in gameweeks:
+                    self._rebuild_ownership(c, gameweek)
+                if gameweeks:
+                    backfilled = True
+                    print("Aggregated player ownership for existing gameweeks")
+            
+            # Season award counts per team and award type, kept in step with award_winners;
+            # names are read from each team's latest gameweek when the tally is served
+            c.execute('PRAGMA table_info(award_tally)')
+            if 'team_name' in {row[1] for row in c.fetchall()}:
+                print("Recreating award_tally without stored team names")
+                c.execute('DROP TABLE award_tally')
+            c.execute('''CREATE TABLE IF NOT EXISTS award_tally
+                         (team_id INTEGER, award_type TEXT, wins INTEGER,
+                          PRIMARY KEY (team_id, award_type))''')
+            c.execute('SELECT EXISTS (SELECT 1 FROM award_tally)')
+            if not c.fetchone()[0] and self._rebuild_award_tally(c):
+                backfilled = True
+                print("Tallied season awards for existing gameweeks")
+            
+            # League records and the per-gameweek checkpoints they are resumed from
+            if league_records.create_tables(c):
+                league_records.update(c, 1)
+                backfilled = True
+                print("Computed league records for existing gameweeks")
+            
             conn.commit()
+            return backfilled
     
     @contextmanager
     def get_connection(self):
@@ -78,10 +231,344 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    @contextmanager
+    def get_read_connection(self):
+        """Read-only connection to the published snapshot (the main database inside staging())."""
+        conn = None
+        if not getattr(self._local, 'depth', 0):
+            conn = self.snapshots.connect()
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    @contextmanager
+    def staging(self):
+        """Group this thread's writes and publish them as one snapshot at the end.
+        
+        Only one thread stages at a time; the others wait, and standalone
+        writes wait before publishing, so every snapshot holds whole ingests.
+        Fetch before entering the block so slow upstream calls never hold
+        up other gameweeks' writes.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0:
+            self._publish_lock.acquire()
+            self._local.pending = []
+            self._local.records_from = None
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                try:
+                    records_from, self._local.records_from = self._local.records_from, None
+                    if records_from is not None:
+                        self._replay_league_records(records_from)
+                    pending, self._local.pending = self._local.pending, []
+                    if pending:
+                        self._publish_and_notify(pending)
+                finally:
+                    self._publish_lock.release()
+    
+    def _update_league_records(self, c, gameweek):
+        """Replay league records from gameweek, once per staging block when inside one."""
+        if getattr(self._local, 'depth', 0):
+            records_from = self._local.records_from
+            self._local.records_from = gameweek if records_from is None else min(records_from, gameweek)
+        else:
+            league_records.update(c, gameweek)
+    
+    def _replay_league_records(self, from_gameweek):
+        """Bring league records up to date after a staging block, before it is published.
+        
+        A failed replay is remembered and retried before every later publish
+        until it succeeds, so the records cannot silently fall behind.
+        """
+        with self._publish_lock:
+            if self._records_from is not None:
+                from_gameweek = min(from_gameweek, self._records_from)
+            try:
+                with self.get_connection() as conn:
+                    league_records.update(conn.cursor(), from_gameweek)
+                    conn.commit()
+            except Exception as e:
+                print(f"Error updating league records from gameweek {from_gameweek}, will retry: {e}")
+                self._records_from = from_gameweek
+                return
+            self._records_from = None
+    
+    def _changed(self, table, gameweek):
+        """Publish a committed write, or queue it until the staging block ends."""
+        if getattr(self._local, 'depth', 0):
+            self._local.pending.append((table, gameweek))
+        else:
+            self._publish_and_notify([(table, gameweek)])
+    
+    def _publish_and_notify(self, changes):
+        """Publish a snapshot, then tell listeners about everything it newly contains.
+        
+        If publishing fails, readers still see the old snapshot, so listeners
+        are not told; the changes are carried over to the next publish.
+        """
+        with self._publish_lock:
+            if self._records_from is not None:
+                self._replay_league_records(self._records_from)
+            changes = self._unpublished + list(changes)
+            try:
+                self.snapshots.publish()
+            except Exception as e:
+                print(f"Error publishing database snapshot: {e}")
+                self._unpublished = changes
+                return
+            self._unpublished = []
+        for table, gameweek in dict.fromkeys(changes):
+            self._notify(table, gameweek)
+    
+    def rollback_snapshot(self):
+        """Restore the newest earlier snapshot whose data differs from the current one; return its name.
+        
+        Returns None when no retained snapshot differs. The snapshot rolled
+        back, any identical ones skipped over and the restored one (the newly
+        published snapshot holds the same data) are discarded afterwards, so
+        repeated rollbacks keep stepping further back.
+        """
+        names = self.snapshots.list_snapshots()
+        bad = self.snapshots.current_name()
+        if bad not in names:
+            return None
+        skipped = []
+        restored = None
+        changes = []
+        with self.staging():
+            with self.get_connection() as conn:
+                c = conn.cursor()
+                for name in reversed(names[:names.index(bad)]):
+                    c.execute('ATTACH DATABASE ? AS previous', (os.path.join(self.snapshots.snapshot_dir, name),))
+                    differences = {}
+                    for table in DATA_TABLES:
+                        # Only gameweeks whose rows differ need to be restored and announced
+                        c.execute(f'''SELECT gameweek FROM (SELECT * FROM main.{table} EXCEPT SELECT * FROM previous.{table})
+                                      UNION
+                                      SELECT gameweek FROM (SELECT * FROM previous.{table} EXCEPT SELECT * FROM main.{table})''')
+                        gameweeks = [row[0] for row in c.fetchall()]
+                        if gameweeks:
+                            differences[table] = gameweeks
+                    if differences:
+                        restored = name
+                        break
+                    c.execute('DETACH DATABASE previous')
+                    skipped.append(name)
+                if restored is None:
+                    return None
+                
+                for table in DATA_TABLES:
+                    c.execute(f'DELETE FROM {table}')
+                    c.execute(f'INSERT INTO {table} SELECT * FROM previous.{table}')
+                    for gameweek in differences.get(table, []):
+                        self._record_change(c, table, gameweek)
+                        changes.append((table, gameweek))
+                for gameweek in sorted({gw for table, gw in changes if table != 'player_performance'}):
+                    self._refresh_standings(c, gameweek)
+                    self._refresh_standings(c, gameweek + 1)
+                if any(table == 'fpl_data' for table, gw in changes):
+                    self._rebuild_team_search(c)
+                for table, gameweek in changes:
+                    if table == 'player_performance':
+                        self._rebuild_ownership(c, gameweek)
+                if any(table == 'award_winners' for table, gw in changes):
+                    self._rebuild_award_tally(c)
+                league_records.update(c, min(gw for table, gw in changes))
+                conn.commit()
+                c.execute('DETACH DATABASE previous')
+            for table, gameweek in changes:
+                self._changed(table, gameweek)
+        
+        if self.snapshots.current_name() == bad:
+            # Publishing failed: keep every snapshot so nothing is lost
+            print(f"Rollback to snapshot {restored} was not published")
+            return None
+        for name in [bad, restored] + skipped:
+            self.snapshots.discard(name)
+        print(f"Rolled back database from snapshot {bad} to {restored}")
+        return restored
+    
+    def add_listener(self, callback):
+        """Register a callback(table, gameweek) invoked after a write commits."""
+        self._listeners.append(callback)
+    
+    def _notify(self, table, gameweek):
+        """Tell registered listeners that a table changed for a gameweek."""
+        for callback in list(self._listeners):
+            try:
+                callback(table, gameweek)
+            except Exception as e:
+                print(f"Error in database listener for {table} (GW{gameweek}): {e}")
+    
+    def _refresh_standings(self, c, gameweek):
+        """Recompute a gameweek's materialized standings inside the caller's transaction."""
+        c.execute('DELETE FROM standings WHERE gameweek = ?', (gameweek,))
+        c.execute('''INSERT INTO standings
+                     SELECT cur.gameweek, cur.team_id, cur.team_name, cur.manager_name, cur.gw_points,
+                            cur.total_points, cur.team_value, cur.bank_balance, cur.league_rank,
+                            COALESCE(prev.league_rank - cur.league_rank, 0),
+                            EXISTS (SELECT 1 FROM award_winners a
+                                    WHERE a.gameweek = cur.gameweek AND a.team_id = cur.team_id)
+                     FROM (SELECT *, RANK() OVER (ORDER BY total_points DESC) AS league_rank
+                           FROM fpl_data WHERE gameweek = ?) AS cur
+                     LEFT JOIN (SELECT team_id, RANK() OVER (ORDER BY total_points DESC) AS league_rank
+                                FROM fpl_data WHERE gameweek = ?) AS prev
+                       ON prev.team_id = cur.team_id''', (gameweek, gameweek - 1))
+    
+    def _apply_team_ownership(self, c, gameweek, team_id, sign):
+        """Add (sign=1) or remove (sign=-1) one team's picks in the gameweek's ownership totals."""
+        c.execute(f'''INSERT INTO player_ownership
+                      SELECT gameweek, player_id, player_name, element_type,
+                             ?, ? * starter, ? * captain, ? * triple_captain,
+                             ? * multiplier, ? * multiplier * gw_points
+                      FROM ({_PICK_MULTIPLIERS}) WHERE gameweek = ? AND team_id = ?
+                      ON CONFLICT (gameweek, element) DO UPDATE SET
+                          owners = owners + excluded.owners,
+                          starters = starters + excluded.starters,
+                          captains = captains + excluded.captains,
+                          triple_captains = triple_captains + excluded.triple_captains,
+                          multiplier_total = multiplier_total + excluded.multiplier_total,
+                          points = points + excluded.points''',
+                  (sign, sign, sign, sign, sign, sign, gameweek, team_id))
+        c.execute('DELETE FROM player_ownership WHERE gameweek = ? AND owners <= 0', (gameweek,))
+        if sign > 0:
+            # Take names and types the way a rebuild does, whichever team was saved last
+            c.execute('''UPDATE player_ownership SET (player_name, element_type) =
+                             (SELECT MAX(player_name), MAX(element_type) FROM player_performance p
+                              WHERE p.gameweek = player_ownership.gameweek AND p.player_id = player_ownership.element)
+                         WHERE gameweek = ? AND element IN
+                             (SELECT player_id FROM player_performance WHERE gameweek = ? AND team_id = ?)''',
+                      (gameweek, gameweek, team_id))
+    
+    def _rebuild_ownership(self, c, gameweek):
+        """Recompute a gameweek's ownership totals from player_performance."""
+        c.execute('DELETE FROM player_ownership WHERE gameweek = ?', (gameweek,))
+        c.execute(f'''INSERT INTO player_ownership
+                      SELECT gameweek, player_id, MAX(player_name), MAX(element_type),
+                             COUNT(*), SUM(starter), SUM(captain), SUM(triple_captain),
+                             SUM(multiplier), SUM(multiplier * gw_points)
+                      FROM ({_PICK_MULTIPLIERS}) WHERE gameweek = ?
+                      GROUP BY gameweek, player_id''', (gameweek,))
+    
+    def _apply_award_tally(self, c, gameweek, sign):
+        """Add (sign=1) or remove (sign=-1) a gameweek's stored winners in the season tally."""
+        c.execute('''INSERT INTO award_tally (team_id, award_type, wins)
+                     SELECT team_id, award_type, ? * COUNT(*)
+                     FROM award_winners WHERE gameweek = ?
+                     GROUP BY team_id, award_type
+                     ON CONFLICT (team_id, award_type) DO UPDATE SET wins = wins + excluded.wins''',
+                  (sign, gameweek))
+        c.execute('DELETE FROM award_tally WHERE wins <= 0')
+    
+    def _rebuild_award_tally(self, c):
+        """Recount the season tally from award_winners; True if there were any awards."""
+        c.execute('DELETE FROM award_tally')
+        c.execute('''INSERT INTO award_tally (team_id, award_type, wins)
+                     SELECT team_id, award_type, COUNT(*)
+                     FROM award_winners GROUP BY team_id, award_type''')
+        return c.rowcount > 0
+    
+    def _index_team_name(self, c, gameweek, team_id, team_name, manager_name):
+        """Add a team's names to the search index (if new) inside the caller's transaction."""
+        c.execute('''INSERT OR IGNORE INTO team_names
+                     (team_id, team_name, manager_name, first_gameweek, last_gameweek)
+                     VALUES (?, ?, ?, ?, ?)''', (team_id, team_name, manager_name, gameweek, gameweek))
+        if c.rowcount:
+            c.execute('INSERT INTO team_search (rowid, names) VALUES (?, ?)',
+                      (c.lastrowid, f"{fold_name(team_name)} {fold_name(manager_name)}"))
+        else:
+            c.execute('''UPDATE team_names
+                         SET first_gameweek = MIN(first_gameweek, ?), last_gameweek = MAX(last_gameweek, ?)
+                         WHERE team_id = ? AND team_name = ? AND manager_name = ?''',
+                      (gameweek, gameweek, team_id, team_name, manager_name))
+    
+    def _unindex_team_name(self, c, team_id, team_name, manager_name):
+        """Narrow a name's gameweek range to where fpl_data still uses it, or drop it from the index."""
+        c.execute('''SELECT MIN(gameweek), MAX(gameweek) FROM fpl_data
+                     WHERE team_id = ? AND team_name IS ? AND manager_name IS ?''', (team_id, team_name, manager_name))
+        first, last = c.fetchone()
+        c.execute('SELECT rowid FROM team_names WHERE team_id = ? AND team_name IS ? AND manager_name IS ?',
+                  (team_id, team_name, manager_name))
+        row = c.fetchone()
+        if row is None:
+            return
+        if first is None:
+            c.execute('DELETE FROM team_search WHERE rowid = ?', (row[0],))
+            c.execute('DELETE FROM team_names WHERE rowid = ?', (row[0],))
+        else:
+            c.execute('UPDATE team_names SET first_gameweek = ?, last_gameweek = ? WHERE rowid = ?',
+                      (first, last, row[0]))
+    
+    def _rebuild_team_search(self, c):
+        """Re-index all names from fpl_data; True if there were any."""
+        c.execute('DELETE FROM team_names')
+        c.execute('DELETE FROM team_search')
+        c.execute('SELECT gameweek, team_id, team_name, manager_name FROM fpl_data ORDER BY gameweek')
+        rows = c.fetchall()
+        for row in rows:
+            self._index_team_name(c, *row)
+        return bool(rows)
+    
+    def _record_change(self, c, table, gameweek):
+        """Append to the change log inside the caller's transaction."""
+        c.execute('INSERT INTO data_changes (table_name, gameweek) VALUES (?, ?)', (table, gameweek))
+        version = c.lastrowid
+        # Keep the log short; followers only need recent entries
+        c.execute('DELETE FROM data_changes WHERE version <= ?', (version - 1000,))
+        with self._changes_lock:
+            self._local_versions.add(version)
+        return version
+    
+    def get_data_version(self):
+        """Return the published data version (0 if nothing was written yet)."""
+        with self.get_read_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT MAX(version) FROM data_changes')
+            return c.fetchone()[0] or 0
+    
+    def _staging_version(self):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT MAX(version) FROM data_changes')
+            return c.fetchone()[0] or 0
+    
+    def sync_external_changes(self):
+        """Notify listeners of writes other processes have published since the last check."""
+        with self.get_read_connection() as conn:
+            c = conn.cursor()
+            c.execute('''SELECT version, table_name, gameweek FROM data_changes
+                         WHERE version > ? ORDER BY version''', (self._seen_version,))
+            rows = c.fetchall()
+        
+        external = 0
+        for version, table, gameweek in rows:
+            self._seen_version = max(self._seen_version, version)
+            with self._changes_lock:
+                if version in self._local_versions:
+                    self._local_versions.discard(version)
+                    continue
+            external += 1
+            self._notify(table, gameweek)
+        if external:
+            print(f"Picked up {external} change(s) from other processes (data version {self._seen_version})")
+        return external
+    
     def save_fpl_data(self, gameweek, teams_data):
         """Save FPL data for a specific gameweek."""
         with self.get_connection() as conn:
             c = conn.cursor()
+            # Names the saved teams had in this gameweek; replaced ones leave the search index below
+            saved = {team['team_id'] for team in teams_data}
+            c.execute('SELECT team_id, team_name, manager_name FROM fpl_data WHERE gameweek = ?', (gameweek,))
+            previous_names = {row for row in c.fetchall() if row[0] in saved}
             for team in teams_data:
                 c.execute('''INSERT OR REPLACE INTO fpl_data 
                              (gameweek, team_id, team_name, manager_name, gw_points, 
@@ -90,13 +577,25 @@ class DatabaseManager:
                           (gameweek, team['team_id'], team['team_name'], 
                            team['manager_name'], team['gw_points'], team['total_points'],
                            team['team_value'], team['bank_balance']))
+            for team in teams_data:
+                self._index_team_name(c, gameweek, team['team_id'], team['team_name'], team['manager_name'])
+            current_names = {(team['team_id'], team['team_name'], team['manager_name']) for team in teams_data}
+            for names in previous_names - current_names:
+                self._unindex_team_name(c, *names)
+            # Rank changes of the next gameweek are relative to this one
+            self._refresh_standings(c, gameweek)
+            self._refresh_standings(c, gameweek + 1)
+            self._update_league_records(c, gameweek)
+            self._record_change(c, 'fpl_data', gameweek)
             conn.commit()
+        self._changed('fpl_data', gameweek)
     
     def save_award_winners(self, gameweek, awards_data):
         """Save award winners for a specific gameweek."""
         with self.get_connection() as conn:
             c = conn.cursor()
-            # First, clear existing awards for this gameweek
+            # First, clear existing awards for this gameweek (and take them out of the season tally)
+            self._apply_award_tally(c, gameweek, -1)
             c.execute('DELETE FROM award_winners WHERE gameweek = ?', (gameweek,))
             
             # Then insert all new awards
@@ -110,13 +609,20 @@ class DatabaseManager:
                                   (gameweek, award_type, winner.get('team_id'),
                                    winner.get('team_name'), winner.get('manager_name'),
                                    winner.get('points'), winner.get('details', '')))
+            self._apply_award_tally(c, gameweek, 1)
+            self._refresh_standings(c, gameweek)
+            self._update_league_records(c, gameweek)
+            self._record_change(c, 'award_winners', gameweek)
             conn.commit()
+        self._changed('award_winners', gameweek)
     
     def save_player_performance(self, gameweek, team_id, players_data):
         """Save player performance data for a team in a gameweek."""
         with self.get_connection() as conn:
             c = conn.cursor()
             print(f"Attempting to save {len(players_data)} players for team {team_id} in gameweek {gameweek}")
+            # Take the team's current picks out of the ownership totals; the new ones go back in below
+            self._apply_team_ownership(c, gameweek, team_id, -1)
             for i, player in enumerate(players_data):
                 try:
                     c.execute('''INSERT OR REPLACE INTO player_performance
@@ -132,12 +638,32 @@ class DatabaseManager:
                 except Exception as e:
                     print(f"  Error saving player {i}: {e}")
                     print(f"  Player data: {player}")
+            self._apply_team_ownership(c, gameweek, team_id, 1)
+            self._update_league_records(c, gameweek)
+            self._record_change(c, 'player_performance', gameweek)
             conn.commit()
             print(f"  Committed {len(players_data)} players to database")
+        self._changed('player_performance', gameweek)
+    
+    def save_live_standings(self, gameweek, payload):
+        """Store a gameweek's provisional standings for every process to serve."""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('INSERT OR REPLACE INTO live_standings (gameweek, payload, updated_at) VALUES (?, ?, ?)',
+                      (gameweek, records.dumps(payload), time.time()))
+            conn.commit()
+    
+    def get_live_standings(self, gameweek, newer_than=0):
+        """Return (updated_at, payload JSON) of stored live standings, or None if none is newer than newer_than."""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT updated_at, payload FROM live_standings WHERE gameweek = ? AND updated_at > ?',
+                      (gameweek, newer_than))
+            return c.fetchone()
     
     def get_fpl_data(self, gameweek):
         """Get FPL data for a specific gameweek."""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             c = conn.cursor()
             c.execute('''SELECT team_id, team_name, manager_name, gw_points, 
                                 total_points, team_value, bank_balance 
@@ -163,7 +689,7 @@ class DatabaseManager:
     
     def get_awards(self, gameweek):
         """Get awards for a specific gameweek."""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             c = conn.cursor()
             c.execute('''SELECT award_type, team_id, team_name, manager_name, 
                                 points, additional_data 
@@ -195,7 +721,7 @@ class DatabaseManager:
         if gameweek <= 1:
             return {}
         
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             c = conn.cursor()
             c.execute('''SELECT team_id, total_points, gw_points 
                          FROM fpl_data WHERE gameweek = ?''', (gameweek - 1,))
@@ -210,9 +736,216 @@ class DatabaseManager:
             
             return previous_data
     
+    def get_team_histories(self):
+        """Every team's gameweek-by-gameweek points, league rank, rank change and award types.
+        
+        Ranks and rank changes for the whole league come from one query with
+        window functions; returns {team_id: [row dicts ordered by gameweek]}.
+        """
+        with self.get_read_connection() as conn:
+            c = conn.cursor()
+            c.execute('''WITH ranked AS (
+                             SELECT gameweek, team_id, team_name, manager_name, gw_points, total_points,
+                                    RANK() OVER (PARTITION BY gameweek ORDER BY total_points DESC) AS league_rank
+                             FROM fpl_data
+                         ), history AS (
+                             SELECT ranked.*,
+                                    LAG(gameweek) OVER team_gameweeks AS previous_gameweek,
+                                    LAG(league_rank) OVER team_gameweeks AS previous_rank
+                             FROM ranked
+                             WINDOW team_gameweeks AS (PARTITION BY team_id ORDER BY gameweek)
+                         )
+                         SELECT history.team_id, history.team_name, history.manager_name, history.gameweek,
+                                history.gw_points, history.total_points, history.league_rank,
+                                CASE WHEN history.previous_gameweek = history.gameweek - 1
+                                     THEN history.previous_rank - history.league_rank ELSE 0 END,
+                                awards.award_types
+                         FROM history
+                         LEFT JOIN (SELECT gameweek, team_id, GROUP_CONCAT(award_type) AS award_types
+                                    FROM award_winners GROUP BY gameweek, team_id) AS awards
+                           ON awards.gameweek = history.gameweek AND awards.team_id = history.team_id
+                         ORDER BY history.team_id, history.gameweek''')
+            rows = c.fetchall()
+        
+        histories = {}
+        for row in rows:
+            histories.setdefault(row[0], []).append({
+                'team_name': row[1],
+                'manager_name': row[2],
+                'gameweek': row[3],
+                'gw_points': row[4],
+                'total_points': row[5],
+                'overall_rank': row[6],
+                'rank_change': row[7],
+                'awards': row[8].split(',') if row[8] else []
+            })
+        return histories
+    
+    def get_standings_page(self, gameweek, sort='total', limit=50, after=None, awards_only=False, search=None):
+        """One page of a gameweek's materialized standings, ordered by a sort key.
+        
+        Paging is keyset-based: ``after`` is the (sort value, team_id) of the
+        last row of the previous page, so each page is an index range scan
+        whatever the league size. Returns (rows, next key or None); each row
+        is a dict with the team's award type codes.
+        """
+        column = STANDINGS_SORTS[sort]
+        query = ['''SELECT team_id, team_name, manager_name, gw_points, total_points, team_value,
+                           bank_balance, overall_rank, rank_change
+                    FROM standings WHERE gameweek = ?''']
+        params = [gameweek]
+        if after is not None:
+            # The <= bound lets SQLite start the index scan at the cursor
+            query.append(f'AND {column} <= ? AND ({column} < ? OR team_id > ?)')
+            params.extend([after[0], after[0], after[1]])
+        if awards_only:
+            query.append('AND has_award = 1')
+        if search:
+            # Same folded word-prefix matching as search_teams(), against the names this gameweek shows
+            match = search_match(search)
+            if match is None:
+                return [], None
+            query.append('''AND (team_id, team_name, manager_name) IN
+                                (SELECT n.team_id, n.team_name, n.manager_name
+                                 FROM team_search JOIN team_names AS n ON n.rowid = team_search.rowid
+                                 WHERE team_search MATCH ?)''')
+            params.append(match)
+        query.append(f'ORDER BY {column} DESC, team_id LIMIT ?')
+        # One extra row tells whether there is a next page
+        params.append(limit + 1)
+        
+        with self.get_read_connection() as conn:
+            c = conn.cursor()
+            c.execute(' '.join(query), params)
+            rows = c.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            awards = {}
+            if rows:
+                team_ids = [row[0] for row in rows]
+                c.execute(f'''SELECT team_id, award_type FROM award_winners
+                              WHERE gameweek = ? AND team_id IN ({','.join('?' * len(team_ids))})
+                              ORDER BY award_type''', [gameweek] + team_ids)
+                for team_id, award_type in c.fetchall():
+                    awards.setdefault(team_id, []).append(award_type)
+        
+        page = []
+        for row in rows:
+            page.append({
+                'team_id': row[0],
+                'team_name': row[1],
+                'manager_name': row[2],
+                'gw_points': row[3],
+                'total_points': row[4],
+                'team_value': row[5],
+                'bank_balance': row[6],
+                'overall_rank': row[7],
+                'rank_change': row[8],
+                'awards': awards.get(row[0], [])
+            })
+        next_key = None
+        if has_more and page:
+            next_key = (page[-1][column], page[-1]['team_id'])
+        return page, next_key
+    
+    def search_teams(self, query, limit=10):
+        """Teams whose team or manager name has words starting with every word of the query.
+        
+        Matching ignores case and diacritics ('laer' finds 'Lærum'). Returns
+        the best-ranked name of each team with the gameweeks it was used in.
+        """
+        match = search_match(query)
+        if match is None:
+            return []
+        with self.get_read_connection() as conn:
+            c = conn.cursor()
+            # Keep each team's best-ranked name in SQL so LIMIT counts teams, not names
+            c.execute('''SELECT team_id, team_name, manager_name, first_gameweek, last_gameweek
+                         FROM (SELECT n.team_id, n.team_name, n.manager_name, n.first_gameweek, n.last_gameweek,
+                                      team_search.rank AS score,
+                                      ROW_NUMBER() OVER (PARTITION BY n.team_id
+                                                         ORDER BY team_search.rank, n.last_gameweek DESC) AS choice
+                               FROM team_search JOIN team_names AS n ON n.rowid = team_search.rowid
+                               WHERE team_search MATCH ?)
+                         WHERE choice = 1
+                         ORDER BY score, last_gameweek DESC
+                         LIMIT ?''', (match, limit))
+            rows = c.fetchall()
+        
+        return [{
+            'team_id': row[0],
+            'team_name': row[1],
+            'manager_name': row[2],
+            'first_gameweek': row[3],
+            'last_gameweek': row[4]
+        } for row in rows]
+    
+    def get_ownership(self, gameweek, element=None):
+        """League ownership per player for a gameweek (one player if element is given).
+        
+        Returns (number of teams with picks, rows ordered by owners); ownership
+        and effective ownership are percentages of those teams.
+        """
+        with self.get_read_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT COUNT(DISTINCT team_id) FROM player_performance WHERE gameweek = ?', (gameweek,))
+            teams = c.fetchone()[0]
+            query = '''SELECT element, player_name, element_type, owners, starters, captains,
+                              triple_captains, multiplier_total, points
+                       FROM player_ownership WHERE gameweek = ?'''
+            params = [gameweek]
+            if element is not None:
+                query += ' AND element = ?'
+                params.append(element)
+            c.execute(query + ' ORDER BY owners DESC, multiplier_total DESC, element', params)
+            rows = c.fetchall()
+        
+        players = []
+        for row in rows:
+            players.append({
+                'element': row[0],
+                'player_name': row[1],
+                'element_type': row[2],
+                'owners': row[3],
+                'starters': row[4],
+                'captains': row[5],
+                'triple_captains': row[6],
+                'ownership': round(100.0 * row[3] / teams, 1) if teams else 0,
+                'effective_ownership': round(100.0 * row[7] / teams, 1) if teams else 0,
+                'points': row[8]
+            })
+        return teams, players
+    
+    def get_award_tally(self):
+        """Season award counts: {award_type: [rows ordered by wins]}, named as in each team's latest gameweek."""
+        with self.get_read_connection() as conn:
+            c = conn.cursor()
+            c.execute('''SELECT t.award_type, t.team_id, f.team_name, f.manager_name, t.wins
+                         FROM award_tally t
+                         LEFT JOIN fpl_data f ON f.team_id = t.team_id
+                              AND f.gameweek = (SELECT MAX(gameweek) FROM fpl_data WHERE team_id = t.team_id)
+                         ORDER BY t.award_type, t.wins DESC, f.team_name''')
+            rows = c.fetchall()
+        
+        tally = {}
+        for award_type, team_id, team_name, manager_name, wins in rows:
+            tally.setdefault(award_type, []).append({
+                'team_id': team_id,
+                'team_name': team_name,
+                'manager_name': manager_name,
+                'wins': wins
+            })
+        return tally
+    
+    def get_league_records(self):
+        """Hall of fame records as of the published data."""
+        with self.get_read_connection() as conn:
+            return league_records.load(conn.cursor())
+    
     def get_available_gameweeks(self):
         """Get list of available gameweeks in the database."""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             c = conn.cursor()
             c.execute('''SELECT DISTINCT gameweek FROM fpl_data ORDER BY gameweek''')
             rows = c.fetchall()
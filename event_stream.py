@@ -0,0 +1,134 @@
+import json
+import queue
+import threading
+from database_manager import db_manager
+from read_model import read_model
+
+# Column order of each compact standings row sent to clients
+STANDINGS_FIELDS = ['team_id', 'gw_points', 'total_points', 'overall_rank', 'rank_change']
+
+class EventBroadcaster:
+    """Fan out standings/award changes to Server-Sent Events subscribers.
+
+    Each change is diffed against the last snapshot of its gameweek and
+    serialized once; every subscriber queue receives the same bytes.
+    """
+
+    def __init__(self, max_queued_events=50):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._snapshots = {}
+        self._event_id = 0
+        self.max_queued_events = max_queued_events
+        db_manager.add_listener(self._on_database_change)
+
+    def subscribe(self):
+        """Register a new subscriber and return its message queue."""
+        subscriber = queue.Queue(maxsize=self.max_queued_events)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        print(f"SSE subscriber connected ({len(self._subscribers)} active)")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber queue."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        print(f"SSE subscriber disconnected ({len(self._subscribers)} active)")
+
+    def is_subscribed(self, subscriber):
+        """False once a subscriber has been dropped for falling behind."""
+        with self._lock:
+            return subscriber in self._subscribers
+
+    def close_all(self):
+        """Drop every subscriber and wake its stream so the connection ends."""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, set()
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(b'')
+            except queue.Full:
+                pass
+
+    def publish(self, event, data):
+        """Serialize an event once and queue it for every subscriber."""
+        with self._lock:
+            self._event_id += 1
+            body = json.dumps(data, separators=(',', ':'))
+            message = f"id: {self._event_id}\nevent: {event}\ndata: {body}\n\n".encode('utf-8')
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    # Slow client: drop it, the browser reconnects and reloads
+                    self._subscribers.discard(subscriber)
+                    print("Dropped SSE subscriber that fell behind")
+
+    def _on_database_change(self, table, gameweek):
+        """Broadcast a standings/awards diff after standings or awards commit."""
+        if table not in ('fpl_data', 'award_winners'):
+            return
+        try:
+            diff = self._diff_gameweek(gameweek)
+            if diff:
+                self.publish('standings', diff)
+        except Exception as e:
+            print(f"Error broadcasting update for gameweek {gameweek}: {e}")
+
+    def _build_snapshot(self, gameweek):
+        """Current compact standings rows and awards for a gameweek."""
+        teams = read_model.get_teams(gameweek) or []
+        ranks = read_model.get_ranks(gameweek)
+        previous_ranks = read_model.get_ranks(gameweek - 1)
+
+        rows = {}
+        for team in teams:
+            team_id = team.team_id
+            previous_rank = previous_ranks.get(team_id)
+            rows[team_id] = [team_id, team.gw_points, team.total_points, ranks[team_id],
+                             previous_rank - ranks[team_id] if previous_rank else 0]
+
+        awards = {}
+        for award_type, winners in read_model.get_awards(gameweek).items():
+            awards[award_type] = [{
+                'team_id': w.team_id,
+                'team_name': w.team_name,
+                'manager_name': w.manager_name,
+                'points': w.points,
+                'details': w.details
+            } for w in winners]
+        return {'rows': rows, 'awards': awards}
+
+    def _diff_gameweek(self, gameweek):
+        """Compare a gameweek with its last broadcast snapshot."""
+        snapshot = self._build_snapshot(gameweek)
+        with self._lock:
+            previous = self._snapshots.get(gameweek)
+            self._snapshots[gameweek] = snapshot
+
+        if previous is None:
+            return {
+                'gameweek': gameweek,
+                'full': True,
+                'fields': STANDINGS_FIELDS,
+                'teams': list(snapshot['rows'].values()),
+                'awards': snapshot['awards']
+            }
+
+        changed = [row for team_id, row in snapshot['rows'].items()
+                   if previous['rows'].get(team_id) != row]
+        removed = [team_id for team_id in previous['rows'] if team_id not in snapshot['rows']]
+        awards_changed = snapshot['awards'] != previous['awards']
+        if not changed and not removed and not awards_changed:
+            return None
+
+        diff = {'gameweek': gameweek, 'full': False, 'fields': STANDINGS_FIELDS, 'teams': changed}
+        if removed:
+            diff['removed'] = removed
+        if awards_changed:
+            diff['awards'] = snapshot['awards']
+        return diff
+
+# Global event broadcaster instance
+event_broadcaster = EventBroadcaster()
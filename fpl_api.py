@@ -5,6 +5,7 @@ import os
 import time
 from typing import Optional, Any
 from config import Config
+from single_flight import SingleFlight
 
 class FPLAPI:
     def __init__(self):
@@ -26,6 +27,8 @@ class FPLAPI:
         self.last_error = None
         # Simple in-memory cache {endpoint: (timestamp, payload)}
         self._cache = {}
+        # Concurrent identical requests share one upstream fetch
+        self._inflight = SingleFlight()
 
     def _cache_is_fresh(self, cached_at: float) -> bool:
         """Return True if the cached item is still fresh per configuration."""
@@ -67,6 +70,10 @@ class FPLAPI:
             print(f"Failed writing cache file {path}: {e}")
         
     def fetch_data(self, endpoint, max_retries=3):
+        """Fetch data from FPL API, sharing one request among concurrent callers."""
+        return self._inflight.do(('fetch', endpoint), self._fetch_data, endpoint, max_retries)
+    
+    def _fetch_data(self, endpoint, max_retries=3):
         """Fetch data from FPL API with retry logic."""
         url = f"{self.base_url}/{endpoint}"
         
@@ -118,6 +125,10 @@ class FPLAPI:
         """Get data for a specific gameweek."""
         return self.fetch_data(f"event/{gameweek}/live/")
     
+    def get_fixtures(self, gameweek):
+        """Get fixtures (kickoff times and finished flags) for a gameweek."""
+        return self.fetch_data(f"fixtures/?event={gameweek}")
+    
     def get_league_standings(self, league_id):
         """Get league standings."""
         return self.fetch_data(f"leagues-classic/{league_id}/standings/")
@@ -0,0 +1,157 @@
+import threading
+import time
+from datetime import datetime
+from config import Config
+from read_model import read_model
+from fpl_api import fpl_api
+from single_flight import SingleFlight
+
+def parse_deadline(value):
+    """Convert an FPL ISO timestamp (e.g. 2024-08-16T17:30:00Z) to epoch seconds."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+class GameweekResolver:
+    """Cached view of the FPL event calendar with stale-while-revalidate.
+
+    The bootstrap download is only repeated when the cached event state can
+    have changed: shortly while a gameweek is in progress, otherwise at the
+    next deadline. Expired state is still returned immediately while a
+    background refresh runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._state = None
+        self._expires_at = 0
+
+    def get_event_state(self):
+        """Return the cached event state, revalidating in the background when stale."""
+        with self._lock:
+            state = self._state
+            attempted = self._expires_at > 0
+            expired = time.time() >= self._expires_at
+
+        if state is None and not attempted:
+            # Nothing to serve yet, so the first callers have to wait for upstream
+            return self._flight.do('bootstrap', self._revalidate)
+        if state is None:
+            # Upstream failed before; callers fall back to our own gameweeks meanwhile
+            # and it is only retried once GAMEWEEK_RETRY_SECONDS have passed
+            if expired:
+                self._revalidate_in_background()
+            return None
+        if expired:
+            self._revalidate_in_background()
+        return state
+
+    def _revalidate_in_background(self):
+        if 'bootstrap' in self._flight.in_flight():
+            return
+        thread = threading.Thread(target=self._flight.do, args=('bootstrap', self._revalidate), daemon=True)
+        thread.start()
+
+    def _revalidate(self):
+        """Fetch bootstrap-static and rebuild the event state."""
+        bootstrap = fpl_api.get_bootstrap_static()
+        if not bootstrap or 'events' not in bootstrap:
+            print("Gameweek resolver could not refresh events, keeping cached state")
+            with self._lock:
+                self._expires_at = time.time() + Config.GAMEWEEK_RETRY_SECONDS
+                return self._state
+
+        state = self._parse_events(bootstrap['events'])
+        ttl = self._time_to_live(state)
+        with self._lock:
+            self._state = state
+            self._expires_at = time.time() + ttl
+        print(f"Gameweek resolver: current={state['current']} next={state['next']} "
+              f"finished={state['latest_finished']} (valid for {int(ttl)}s)")
+        return state
+
+    def _parse_events(self, events):
+        """Reduce the bootstrap events to the fields the app relies on."""
+        compact = [{
+            'id': e['id'],
+            'deadline': parse_deadline(e.get('deadline_time')),
+            'finished': bool(e.get('finished')),
+            'data_checked': bool(e.get('data_checked')),
+            'is_current': bool(e.get('is_current')),
+            'is_next': bool(e.get('is_next'))
+        } for e in events]
+
+        current = next((e for e in compact if e['is_current']), None)
+        next_event = next((e for e in compact if e['is_next']), None)
+        finished = [e['id'] for e in compact if e['finished']]
+        return {
+            'events': compact,
+            'current': current['id'] if current else None,
+            'current_finished': bool(current and current['finished'] and current['data_checked']),
+            'next': next_event['id'] if next_event else None,
+            'next_deadline': next_event['deadline'] if next_event else None,
+            'latest_finished': max(finished) if finished else None,
+            'first': compact[0]['id'] if compact else None
+        }
+
+    def _time_to_live(self, state):
+        """How long the event state stays valid, derived from deadlines and finished flags."""
+        if state['current'] is not None and not state['current_finished']:
+            # A gameweek is being played; finished/data_checked flags can flip any time
+            return Config.GAMEWEEK_LIVE_TTL_SECONDS
+        if state['next_deadline'] is not None:
+            until_deadline = state['next_deadline'] - time.time()
+            return max(Config.GAMEWEEK_RETRY_SECONDS,
+                       min(until_deadline + 60, Config.GAMEWEEK_MAX_TTL_SECONDS))
+        return Config.GAMEWEEK_MAX_TTL_SECONDS
+
+    def get_events(self):
+        """Return the compact event list (empty if upstream was never reachable)."""
+        state = self.get_event_state()
+        return state['events'] if state else []
+
+    def current_gameweek(self):
+        """Gameweek according to FPL: current, else next, else latest finished."""
+        state = self.get_event_state()
+        if not state:
+            return None
+        for key in ('current', 'next', 'latest_finished', 'first'):
+            if state[key] is not None:
+                return state[key]
+        return None
+
+    def resolve(self):
+        """Combine the FPL gameweek with the gameweeks we have stored.
+
+        Returns the gameweek to display (never ahead of our latest data) and
+        where that answer came from.
+        """
+        api_gameweek = self.current_gameweek()
+        gameweeks = read_model.gameweeks()
+        max_db_gameweek = max(gameweeks) if gameweeks else None
+
+        current_gameweek = api_gameweek
+        source = 'api'
+        if max_db_gameweek is not None:
+            if current_gameweek is None:
+                current_gameweek = max_db_gameweek
+                source = 'db_fallback'
+            elif current_gameweek > max_db_gameweek:
+                # API is ahead of our data, show our latest data
+                current_gameweek = max_db_gameweek
+                source = 'db_latest'
+
+        return {
+            'current_gameweek': current_gameweek,
+            'api_gameweek': api_gameweek,
+            'max_db_gameweek': max_db_gameweek,
+            'gameweeks': gameweeks,
+            'source': source
+        }
+
+# Global gameweek resolver instance
+gameweek_resolver = GameweekResolver()
@@ -0,0 +1,108 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from config import Config
+from database_manager import db_manager
+
+class LeaderElection:
+    """Lease-based leadership stored in the shared SQLite database.
+
+    Each process competes for a row in ``leader_lease``. The holder renews
+    the lease well before it expires; if it dies, another process takes over
+    once the lease lapses. Only the leader runs the refresh scheduler.
+    """
+
+    def __init__(self, name='refresh'):
+        self.name = name
+        self.is_leader = False
+        self._holder_id = None
+        self._holder_pid = None
+        self._heartbeat_thread = None
+
+    @property
+    def holder_id(self):
+        """Identity of this process, regenerated after a fork so workers never share one."""
+        if self._holder_pid != os.getpid():
+            self._holder_pid = os.getpid()
+            self._holder_id = f"{socket.gethostname()}:{self._holder_pid}:{uuid.uuid4().hex[:8]}"
+            self.is_leader = False
+        return self._holder_id
+
+    def try_acquire(self):
+        """Take or renew the lease; return True if this process holds it."""
+        now = time.time()
+        with db_manager.get_connection() as conn:
+            conn.isolation_level = None
+            c = conn.cursor()
+            try:
+                # IMMEDIATE takes the write lock up front so two processes cannot both win
+                c.execute('BEGIN IMMEDIATE')
+                c.execute('SELECT holder, expires_at FROM leader_lease WHERE name = ?', (self.name,))
+                row = c.fetchone()
+                if row and row[0] != self.holder_id and row[1] > now:
+                    c.execute('ROLLBACK')
+                    self.is_leader = False
+                    return False
+                c.execute('INSERT OR REPLACE INTO leader_lease (name, holder, expires_at) VALUES (?, ?, ?)',
+                          (self.name, self.holder_id, now + Config.LEADER_LEASE_SECONDS))
+                c.execute('COMMIT')
+            except Exception as e:
+                print(f"Leader lease check failed: {e}")
+                try:
+                    c.execute('ROLLBACK')
+                except Exception:
+                    pass
+                self.is_leader = False
+                return False
+
+        if not self.is_leader:
+            print(f"Process {self.holder_id} became {self.name} leader")
+        self.is_leader = True
+        return True
+
+    def release(self):
+        """Give up the lease so another process can take over immediately."""
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            with db_manager.get_connection() as conn:
+                c = conn.cursor()
+                c.execute('DELETE FROM leader_lease WHERE name = ? AND holder = ?', (self.name, self.holder_id))
+                conn.commit()
+            print(f"Process {self.holder_id} released {self.name} leadership")
+        except Exception as e:
+            print(f"Error releasing leader lease: {e}")
+
+    def start_heartbeat(self, on_lost=None):
+        """Renew the lease in the background; call on_lost() if it cannot be renewed."""
+        if self._heartbeat_thread and self._heartbeat_thread.is_alive():
+            return
+
+        def heartbeat():
+            while self.is_leader:
+                time.sleep(Config.LEADER_LEASE_SECONDS / 3)
+                if not self.is_leader:
+                    break
+                if not self.try_acquire():
+                    print(f"Process {self.holder_id} lost {self.name} leadership")
+                    if on_lost:
+                        on_lost()
+
+        self._heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        self._heartbeat_thread.start()
+
+    def current_leader(self):
+        """Return the current lease holder and expiry, if any."""
+        with db_manager.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT holder, expires_at FROM leader_lease WHERE name = ?', (self.name,))
+            row = c.fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        return {'holder': row[0], 'expires_in': int(row[1] - time.time())}
+
+# Global leader election instance
+leader_election = LeaderElection()
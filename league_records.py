@@ -0,0 +1,149 @@
+import json
+
+# Hall of fame entries in display order
+RECORD_TYPES = [
+    'highest_gameweek_score',
+    'biggest_rank_climb',
+    'longest_top_streak',
+    'most_consecutive_spoons',
+    'best_captain_haul'
+]
+
+class LeagueRecords:
+    """League records and streaks, advanced one gameweek at a time.
+
+    Gameweeks are processed in order with running per-team state (current
+    streak at #1, current run of wooden spoons) and the records so far. A
+    checkpoint of that state is stored after every gameweek, so a write to
+    gameweek N only replays N onwards from checkpoint N-1. All methods work
+    on the caller's cursor: a standalone write replays inside its own
+    transaction, while a staged batch replays once in a separate transaction
+    after its writes, before the snapshot is published (and again before
+    later publishes if that replay fails).
+    """
+
+    def create_tables(self, c):
+        """Create the checkpoint and records tables; True if existing data needs processing."""
+        c.execute('''CREATE TABLE IF NOT EXISTS league_records_state
+                     (gameweek INTEGER PRIMARY KEY, state TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS league_records
+                     (record TEXT PRIMARY KEY, value INTEGER, team_id INTEGER, team_name TEXT,
+                      manager_name TEXT, gameweek INTEGER, first_gameweek INTEGER, detail TEXT)''')
+        c.execute('''SELECT NOT EXISTS (SELECT 1 FROM league_records_state)
+                            AND EXISTS (SELECT 1 FROM standings)''')
+        return bool(c.fetchone()[0])
+
+    def update(self, c, from_gameweek):
+        """Replay gameweeks from from_gameweek onwards and store the resulting records."""
+        c.execute('DELETE FROM league_records_state WHERE gameweek >= ?', (from_gameweek,))
+        c.execute('''SELECT state FROM league_records_state
+                     WHERE gameweek < ? ORDER BY gameweek DESC LIMIT 1''', (from_gameweek,))
+        row = c.fetchone()
+        state = json.loads(row[0]) if row else {'teams': {}, 'records': {}}
+
+        c.execute('SELECT DISTINCT gameweek FROM standings WHERE gameweek >= ? ORDER BY gameweek', (from_gameweek,))
+        gameweeks = [row[0] for row in c.fetchall()]
+        for gameweek in gameweeks:
+            self._process(c, gameweek, state)
+            c.execute('INSERT INTO league_records_state (gameweek, state) VALUES (?, ?)',
+                      (gameweek, json.dumps(state)))
+
+        c.execute('DELETE FROM league_records')
+        for record, entry in state['records'].items():
+            c.execute('''INSERT INTO league_records
+                         (record, value, team_id, team_name, manager_name, gameweek, first_gameweek, detail)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                      (record, entry['value'], entry['team_id'], entry['team_name'], entry['manager_name'],
+                       entry['gameweek'], entry.get('first_gameweek'), entry.get('detail')))
+        return len(gameweeks)
+
+    def _process(self, c, gameweek, state):
+        """Advance the running state and records by one gameweek."""
+        c.execute('''SELECT team_id, team_name, manager_name, gw_points, overall_rank, rank_change
+                     FROM standings WHERE gameweek = ? ORDER BY team_id''', (gameweek,))
+        standings = c.fetchall()
+        c.execute('''SELECT team_id FROM award_winners
+                     WHERE gameweek = ? AND award_type = 'wooden_spoon' ''', (gameweek,))
+        spoons = {row[0] for row in c.fetchall()}
+        c.execute('''SELECT team_id, player_name,
+                            gw_points * CASE WHEN chips_used = '3xc' THEN 3 ELSE 2 END
+                     FROM player_performance WHERE gameweek = ? AND is_captain
+                     ORDER BY team_id''', (gameweek,))
+        captains = {row[0]: (row[1], row[2]) for row in c.fetchall()}
+
+        records = state['records']
+        for team_id, team_name, manager_name, gw_points, rank, rank_change in standings:
+            team = state['teams'].setdefault(str(team_id), {'top_streak': None, 'spoon_streak': None})
+            names = (team_id, team_name, manager_name)
+
+            self._offer(records, 'highest_gameweek_score', gw_points, names, gameweek)
+            self._offer(records, 'biggest_rank_climb', rank_change, names, gameweek)
+            if team_id in captains:
+                player_name, points = captains[team_id]
+                self._offer(records, 'best_captain_haul', points, names, gameweek, detail=player_name)
+
+            streak = self._extend(team, 'top_streak', rank == 1, gameweek)
+            if streak:
+                self._offer(records, 'longest_top_streak', streak[0], names, gameweek, first_gameweek=streak[1])
+            streak = self._extend(team, 'spoon_streak', team_id in spoons, gameweek)
+            if streak:
+                self._offer(records, 'most_consecutive_spoons', streak[0], names, gameweek, first_gameweek=streak[1])
+
+    def _extend(self, team, key, achieved, gameweek):
+        """Update a [length, first gameweek, last gameweek] streak; return it if still running."""
+        streak = team[key]
+        if not achieved:
+            team[key] = None
+            return None
+        if streak and streak[2] == gameweek - 1:
+            streak = [streak[0] + 1, streak[1], gameweek]
+        else:
+            streak = [1, gameweek, gameweek]
+        team[key] = streak
+        return streak
+
+    def _offer(self, records, record, value, names, gameweek, first_gameweek=None, detail=None):
+        """Replace a record if value beats it (the first team to reach a value keeps it)."""
+        if value is None:
+            return
+        current = records.get(record)
+        if current is not None and value <= current['value']:
+            return
+        team_id, team_name, manager_name = names
+        records[record] = {
+            'value': value,
+            'team_id': team_id,
+            'team_name': team_name,
+            'manager_name': manager_name,
+            'gameweek': gameweek,
+            'first_gameweek': first_gameweek,
+            'detail': detail
+        }
+
+    def load(self, c):
+        """Stored records in display order, with the last gameweek processed."""
+        c.execute('''SELECT record, value, team_id, team_name, manager_name, gameweek, first_gameweek, detail
+                     FROM league_records''')
+        rows = {row[0]: row for row in c.fetchall()}
+        c.execute('SELECT MAX(gameweek) FROM league_records_state')
+        through = c.fetchone()[0]
+
+        records = []
+        for record in RECORD_TYPES:
+            row = rows.get(record)
+            if row is None:
+                continue
+            records.append({
+                'record': record,
+                'value': row[1],
+                'team_id': row[2],
+                'team_name': row[3],
+                'manager_name': row[4],
+                'gameweek': row[5],
+                'first_gameweek': row[6],
+                'detail': row[7]
+            })
+        return {'through_gameweek': through, 'records': records}
+
+# Global league records instance
+league_records = LeagueRecords()
@@ -0,0 +1,346 @@
+import json
+import threading
+import time
+from datetime import datetime
+from config import Config
+from compression import CachedResponse
+from database_manager import db_manager
+from read_model import read_model
+from records import PickRecord
+from fpl_api import fpl_api
+from awards_calculator import awards_calculator
+
+STARTING_XI = 11
+
+# Minimum number of starters per element_type for a valid formation (GKP, DEF, MID, FWD)
+MIN_FORMATION = {1: 1, 2: 3, 3: 2, 4: 1}
+
+class LiveGameweek:
+    """Provisional scoring state for one gameweek."""
+
+    def __init__(self, gameweek):
+        self.gameweek = gameweek
+        self.teams = {}             # team_id -> team dict (names, base totals)
+        self.picks = {}             # team_id -> {'picks' (PickRecords), 'chip', 'transfer_cost'}
+        self.element_teams = {}     # element id -> set of team_ids that picked it
+        self.element_info = {}      # element id -> {'element_type', 'team'}
+        self.stats = {}             # element id -> (points, minutes)
+        self.club_done = {}         # club id -> True once all its fixtures are over
+        self.scores = {}            # team_id -> scored breakdown
+        self.previous_ranks = {}
+        self.previous_data = {}
+        self.polled_at = 0
+        self.payload = None
+        self.lock = threading.Lock()  # held while polling upstream
+
+class LiveScoringEngine:
+    """Compute provisional standings from cached picks and the live event feed.
+
+    Only the refresh leader's scheduler builds and polls the state, and it
+    stores each result in the database; requests in any process just serve
+    the stored standings, so they never wait on upstream.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gameweeks = {}
+        self._served = {}   # gameweek -> (updated_at, CachedResponse) of the stored standings
+
+    def update(self, gameweek):
+        """Cache picks on first use, poll the live feed and store the result; return the payload.
+
+        Caching picks takes a rate-limited fetch per team, so this belongs
+        in a scheduler job, not a request.
+        """
+        state = self._gameweeks.get(gameweek)
+        if state is None:
+            # Only the most recent gameweek's state is kept
+            state = self._create_state(gameweek)
+            if state is None:
+                return None
+            self._gameweeks = {gameweek: state}
+
+        with state.lock:
+            payload = self.poll(state)
+        db_manager.save_live_standings(gameweek, payload)
+        return payload
+
+    def get_live_standings(self, gameweek):
+        """Return the stored provisional standings as a CachedResponse, or None until the leader has polled."""
+        served = self._served.get(gameweek)
+        row = db_manager.get_live_standings(gameweek, served[0] if served else 0)
+        if row is not None:
+            served = (row[0], CachedResponse(json.loads(row[1])))
+            with self._lock:
+                self._served = {gameweek: served}
+        return served[1] if served else None
+
+    def _create_state(self, gameweek):
+        """Load the league's teams and cache every team's picks for the gameweek."""
+        teams = read_model.get_teams(gameweek) or read_model.get_teams(gameweek - 1)
+        if not teams:
+            print(f"No teams available for live scoring of gameweek {gameweek}")
+            return None
+
+        bootstrap = fpl_api.get_bootstrap_static()
+        if not bootstrap or 'elements' not in bootstrap:
+            print("Live scoring needs bootstrap data, none available")
+            return None
+
+        state = LiveGameweek(gameweek)
+        state.element_info = {
+            e['id']: {'element_type': e['element_type'], 'team': e['team']}
+            for e in bootstrap['elements']
+        }
+        state.previous_data = read_model.get_previous_gameweek_data(gameweek)
+        state.previous_ranks = read_model.get_ranks(gameweek - 1)
+
+        has_gameweek_rows = read_model.get_teams(gameweek) is not None
+        for i, team in enumerate(teams):
+            team_id = team.team_id
+            previous = state.previous_data.get(team_id)
+            if previous:
+                base_total = previous['total_points']
+            elif has_gameweek_rows:
+                base_total = team.total_points - team.gw_points
+            else:
+                base_total = team.total_points
+            state.teams[team_id] = {
+                'team_id': team_id,
+                'team_name': team.team_name,
+                'manager_name': team.manager_name,
+                'team_value': team.team_value or 0,
+                'bank_balance': team.bank_balance or 0,
+                'base_total': base_total
+            }
+
+            picks = fpl_api.get_team_picks(team_id, gameweek)
+            if picks and 'picks' in picks:
+                state.picks[team_id] = {
+                    'picks': sorted((PickRecord.from_dict(p) for p in picks['picks']), key=lambda p: p.position),
+                    'chip': picks.get('active_chip') or '',
+                    'transfer_cost': (picks.get('entry_history') or {}).get('event_transfers_cost', 0)
+                }
+                for pick in picks['picks']:
+                    state.element_teams.setdefault(pick['element'], set()).add(team_id)
+            else:
+                print(f"  No picks for {team.team_name}, live points will be 0")
+
+            # Rate limiting - be respectful to FPL API
+            if i < len(teams) - 1:
+                time.sleep(Config.API_DELAY_SECONDS)
+
+        print(f"Cached live picks for {len(state.picks)}/{len(teams)} teams in gameweek {gameweek}")
+        return state
+
+    def poll(self, state):
+        """Pull the live feed and rescore only teams affected by changed players."""
+        live = fpl_api.get_gameweek_data(state.gameweek)
+        if not live or 'elements' not in live:
+            print(f"No live data for gameweek {state.gameweek}")
+            if state.payload is None:
+                state.payload = self._build_payload(state)
+            return state.payload
+
+        changed_elements = set()
+        for element in live['elements']:
+            stats = element.get('stats', {})
+            current = (stats.get('total_points', 0), stats.get('minutes', 0))
+            if state.stats.get(element['id']) != current:
+                state.stats[element['id']] = current
+                changed_elements.add(element['id'])
+
+        # Auto-subs depend on fixtures finishing, so a club finishing touches its players too
+        club_done = self._club_fixture_state(state.gameweek)
+        finished_clubs = {club for club, done in club_done.items() if state.club_done.get(club) != done}
+        state.club_done = club_done
+        if finished_clubs:
+            changed_elements.update(
+                eid for eid in state.element_teams
+                if state.element_info.get(eid, {}).get('team') in finished_clubs)
+
+        affected_teams = set()
+        for eid in changed_elements:
+            affected_teams.update(state.element_teams.get(eid, ()))
+        affected_teams.update(tid for tid in state.teams if tid not in state.scores)
+
+        for team_id in affected_teams:
+            state.scores[team_id] = self._score_team(state, team_id)
+
+        print(f"Live poll GW{state.gameweek}: {len(changed_elements)} changed players, "
+              f"{len(affected_teams)} teams rescored")
+        state.polled_at = time.time()
+        state.payload = self._build_payload(state)
+        return state.payload
+
+    def _club_fixture_state(self, gameweek):
+        """Map club id -> True when all of its fixtures this gameweek are over."""
+        fixtures = fpl_api.get_fixtures(gameweek) or []
+        club_done = {}
+        for fixture in fixtures:
+            done = bool(fixture.get('finished') or fixture.get('finished_provisional'))
+            for club in (fixture.get('team_h'), fixture.get('team_a')):
+                club_done[club] = club_done.get(club, True) and done
+        return club_done
+
+    def _did_not_play(self, state, element_id):
+        """True when a player has no minutes and can no longer get any."""
+        points, minutes = state.stats.get(element_id, (0, 0))
+        if minutes > 0:
+            return False
+        if not state.club_done:
+            # Without fixture data we cannot tell, so assume the player may still feature
+            return False
+        club = state.element_info.get(element_id, {}).get('team')
+        # Clubs without a fixture (blank gameweek) count as finished
+        return state.club_done.get(club, True)
+
+    def _played(self, state, element_id):
+        return state.stats.get(element_id, (0, 0))[1] > 0
+
+    def _apply_auto_subs(self, state, picks):
+        """Return the element ids of the effective starting XI after auto-subs."""
+        starters = [p.element for p in picks if p.position <= STARTING_XI]
+        bench = [p.element for p in picks if p.position > STARTING_XI]
+        element_type = lambda eid: state.element_info.get(eid, {}).get('element_type', 0)
+
+        for i, eid in enumerate(list(starters)):
+            if not self._did_not_play(state, eid):
+                continue
+            for sub in bench:
+                if not self._played(state, sub):
+                    continue
+                # Goalkeepers can only be replaced by goalkeepers
+                if (element_type(eid) == 1) != (element_type(sub) == 1):
+                    continue
+                candidate = starters[:i] + [sub] + starters[i + 1:]
+                counts = {}
+                for c in candidate:
+                    counts[element_type(c)] = counts.get(element_type(c), 0) + 1
+                if any(counts.get(t, 0) < minimum for t, minimum in MIN_FORMATION.items()):
+                    continue
+                starters = candidate
+                bench.remove(sub)
+                break
+        return starters, bench
+
+    def _score_team(self, state, team_id):
+        """Score one team's picks against the current live stats."""
+        team_picks = state.picks.get(team_id)
+        if not team_picks:
+            return {'gw_points': 0, 'wall': 0, 'bench': 0, 'captain': 0, 'captain_id': None, 'chip': ''}
+
+        picks = team_picks['picks']
+        chip = team_picks['chip']
+        points_of = lambda eid: state.stats.get(eid, (0, 0))[0]
+
+        if chip == 'bboost':
+            counted = [p.element for p in picks]
+            bench = []
+        else:
+            counted, bench = self._apply_auto_subs(state, picks)
+
+        captain = next((p.element for p in picks if p.is_captain), None)
+        vice = next((p.element for p in picks if p.is_vice_captain), None)
+        if captain is not None and self._did_not_play(state, captain) and vice in counted:
+            captain = vice
+        multiplier = 3 if chip == '3xc' else 2
+
+        total = sum(points_of(eid) for eid in counted)
+        if captain in counted:
+            total += (multiplier - 1) * points_of(captain)
+
+        wall = sum(points_of(eid) for eid in counted
+                   if state.element_info.get(eid, {}).get('element_type') in (1, 2))
+        return {
+            'gw_points': total - team_picks['transfer_cost'],
+            'wall': wall,
+            'bench': sum(points_of(eid) for eid in bench),
+            'captain': points_of(captain) * multiplier if captain in counted else 0,
+            'captain_id': captain,
+            'chip': chip
+        }
+
+    def _rank_map(self, teams):
+        """Map team_id -> league rank by total points (ties share a rank)."""
+        ordered = sorted(teams, key=lambda x: x['total_points'], reverse=True)
+        ranks = {}
+        current_rank = 1
+        for i, team in enumerate(ordered):
+            if i > 0 and team['total_points'] < ordered[i-1]['total_points']:
+                current_rank = i + 1
+            ranks[team['team_id']] = current_rank
+        return ranks
+
+    def _build_payload(self, state):
+        """Assemble provisional standings and awards from the per-team scores."""
+        teams = []
+        for team_id, team in state.teams.items():
+            score = state.scores.get(team_id, {'gw_points': 0})
+            teams.append({
+                'team_id': team_id,
+                'team_name': team['team_name'],
+                'manager_name': team['manager_name'],
+                'gw_points': score['gw_points'],
+                'total_points': team['base_total'] + score['gw_points'],
+                'team_value': team['team_value'],
+                'bank_balance': team['bank_balance']
+            })
+
+        ranks = self._rank_map(teams)
+        for team in teams:
+            team['overall_rank'] = ranks[team['team_id']]
+            previous_rank = state.previous_ranks.get(team['team_id'])
+            team['rank_change'] = previous_rank - team['overall_rank'] if previous_rank else 0
+        teams.sort(key=lambda x: x['overall_rank'])
+
+        awards = self._provisional_awards(state, teams)
+        team_awards = {}
+        for award_type, winners in awards.items():
+            for winner in winners:
+                team_awards.setdefault(winner['team_id'], []).append(award_type)
+        for team in teams:
+            team['awards'] = team_awards.get(team['team_id'], [])
+
+        return {
+            'gameweek': state.gameweek,
+            'provisional': True,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'standings': teams,
+            'awards': awards
+        }
+
+    def _provisional_awards(self, state, teams):
+        """Compute awards on provisional points using the regular award rules."""
+        eligible = [t for t in teams if not awards_calculator._is_excluded_team(t)]
+        if not eligible:
+            return {}
+
+        awards = {}
+        by_id = {t['team_id']: t for t in eligible}
+        high = max(t['gw_points'] for t in eligible)
+        low = min(t['gw_points'] for t in eligible)
+        summary = lambda t, points, details='': {
+            'team_id': t['team_id'],
+            'team_name': t['team_name'],
+            'manager_name': t['manager_name'],
+            'points': points,
+            'details': details
+        }
+        awards['weekly_champion'] = [summary(t, high) for t in eligible if t['gw_points'] == high]
+        awards['wooden_spoon'] = [summary(t, low) for t in eligible if t['gw_points'] == low]
+        if state.previous_data:
+            awards['performance_of_week'] = awards_calculator.calculate_performance_of_week(
+                state.gameweek, eligible, state.previous_data)
+
+        for award_type, key in (('the_wall', 'wall'), ('benchwarmer', 'bench'), ('captain_fantastic', 'captain')):
+            scored = [(by_id[tid], s[key]) for tid, s in state.scores.items()
+                      if tid in by_id and s.get(key, 0) > 0
+                      and not (award_type == 'benchwarmer' and s.get('chip') == 'bboost')]
+            if scored:
+                best = max(points for _, points in scored)
+                awards[award_type] = [summary(t, points) for t, points in scored if points == best]
+        return awards
+
+# Global live scoring engine instance
+live_scoring = LiveScoringEngine()
@@ -9,19 +9,29 @@ It orchestrates all the modules and provides the main application logic.
 
 import os
 import sys
-import time
 import threading
+import time
 from datetime import datetime, timedelta
 from database_manager import db_manager
 from fpl_api import fpl_api
 from awards_calculator import awards_calculator
 from data_processor import data_processor
-from web_server import start_server
+from web_server import start_server, create_server
+from prefork_server import PreforkServer, install_worker_shutdown, prefork_supported
+from live_scoring import live_scoring
+from read_model import read_model
+from static_assets import static_assets
+from refresh_scheduler import refresh_scheduler, PICKS, LIVE, FINAL
+from write_coordinator import write_coordinator
+from leader_election import leader_election
+from config import Config
 
 class FPLDataServer:
     def __init__(self):
         self.running = False
+        self.stopping = threading.Event()
         self.refresh_thread = None
+        self.sync_thread = None
         
     def start(self, port=None):
         """Start the FPL Data Server."""
@@ -33,12 +43,17 @@ class FPLDataServer:
             
         print("Starting FPL Data Server...")
         Config.print_config()
-        self.running = True
         
-        # Start periodic refresh thread (non-blocking)
-        self.refresh_thread = threading.Thread(target=self.periodic_refresh, daemon=True)
-        self.refresh_thread.start()
-        print("Periodic refresh thread started")
+        # Load the read model and static assets before forking so workers share them
+        read_model.ensure_loaded()
+        static_assets.preload()
+        
+        if Config.WEB_WORKERS > 1 and prefork_supported():
+            # Each worker starts its own background threads after the fork
+            PreforkServer(port, Config.WEB_WORKERS, lambda sock: self.run_worker(port, sock)).serve()
+            return
+        
+        self.start_background_threads()
 
         # Start web server LAST (blocking)
         print("Starting web server...")
@@ -51,45 +66,87 @@ class FPLDataServer:
             print(f"Error starting web server: {e}")
             self.stop()
     
-    def stop(self):
-        """Stop the FPL Data Server."""
+    def start_background_threads(self):
+        """Start the refresh and data-version threads."""
+        self.running = True
+        self.stopping.clear()
+        
+        # Start periodic refresh thread (non-blocking); only the elected leader refreshes
+        self.refresh_thread = threading.Thread(target=self.periodic_refresh, daemon=True)
+        self.refresh_thread.start()
+        print("Refresh scheduler thread started")
+        
+        # Follow writes made by other processes through the data version
+        self.sync_thread = threading.Thread(target=self.sync_data_version, daemon=True)
+        self.sync_thread.start()
+    
+    def run_worker(self, port, sock):
+        """Serve requests in a pre-forked worker process until told to stop."""
+        self.start_background_threads()
+        httpd = create_server(port, sock)
+        install_worker_shutdown(httpd)
+        print(f"Worker {os.getpid()} serving requests")
+        httpd.serve_forever()
+        
+        # SIGTERM only stops new requests; let running requests and refreshes finish before exiting
+        deadline = time.time() + Config.WORKER_GRACEFUL_TIMEOUT
+        httpd.drain(Config.WORKER_GRACEFUL_TIMEOUT)
+        self.stop(timeout=max(0, deadline - time.time()))
+    
+    def stop(self, timeout=5):
+        """Stop the FPL Data Server, waiting up to timeout seconds for a running refresh."""
         print("Stopping FPL Data Server...")
         self.running = False
+        self.stopping.set()
+        refresh_scheduler.wake()
         if self.refresh_thread:
-            self.refresh_thread.join(timeout=5)
+            self.refresh_thread.join(timeout=timeout)
+        leader_election.release()
     
     def periodic_refresh(self):
-        """Periodic data refresh thread."""
+        """Run refresh jobs planned around deadlines and fixtures."""
+        refresh_scheduler.set_handler(PICKS, self.cache_gameweek_picks)
+        refresh_scheduler.set_handler(LIVE, self.poll_live_points)
+        refresh_scheduler.set_handler(FINAL, self.finalize_gameweek)
+        
+        while self.running:
+            if leader_election.try_acquire():
+                leader_election.start_heartbeat(on_lost=refresh_scheduler.wake)
+                refresh_scheduler.run(lambda: self.running and leader_election.is_leader)
+            else:
+                # Another process is the leader; check again when its lease could lapse
+                self.stopping.wait(Config.LEADER_LEASE_SECONDS / 2)
+    
+    def sync_data_version(self):
+        """Pick up standings/awards written by other processes."""
         while self.running:
             try:
-                print("==================================================")
-                print("Starting periodic data refresh...")
-                current_time = datetime.now()
-                print(f"Current time: {current_time}")
-                
-                # Clean up old cache data
-                self.cleanup_old_cache()
-                
-                # Get current gameweek
-                current_gameweek = fpl_api.get_current_gameweek()
-                if current_gameweek:
-                    print(f"Current gameweek: {current_gameweek}")
-                    
-                    # Check if we need to refresh data
-                    if self.should_refresh_data(current_gameweek):
-                        print(f"Refreshing data for gameweek {current_gameweek}")
-                        self.refresh_gameweek_data(current_gameweek)
-                        
-                        # Calculate awards
-                        print(f"Calculating awards for gameweek {current_gameweek}")
-                        self.calculate_gameweek_awards(current_gameweek)
-                
-                # Wait before next refresh (every hour)
-                time.sleep(3600)
-                
+                db_manager.sync_external_changes()
             except Exception as e:
-                print(f"Error in periodic refresh: {e}")
-                time.sleep(300)  # Wait 5 minutes before retrying
+                print(f"Error checking data version: {e}")
+            time.sleep(Config.DATA_VERSION_POLL_SECONDS)
+    
+    def cache_gameweek_picks(self, gameweek):
+        """Cache every team's picks once the deadline has passed."""
+        return live_scoring.update(gameweek) is not None
+    
+    def poll_live_points(self, gameweek):
+        """Update provisional points during a match window."""
+        return live_scoring.update(gameweek) is not None
+    
+    def finalize_gameweek(self, gameweek):
+        """Store final standings and awards once bonus points are confirmed."""
+        print("==================================================")
+        print(f"Finalizing gameweek {gameweek} at {datetime.now()}")
+        
+        # Clean up old cache data
+        self.cleanup_old_cache()
+        
+        return write_coordinator.run(gameweek, 'refresh+awards', self.refresh_with_awards, gameweek)
+    
+    def refresh_with_awards(self, gameweek):
+        """Refresh a gameweek and calculate its awards as one write."""
+        return self.refresh_gameweek_data(gameweek, with_awards=True)
     
     def cleanup_old_cache(self):
         """Clean up old cache data."""
@@ -106,25 +163,8 @@ class FPLDataServer:
         except Exception as e:
             print(f"Error cleaning up cache: {e}")
     
-    def should_refresh_data(self, gameweek):
-        """Check if we should refresh data for a gameweek."""
-        try:
-            # Check if we have data for this gameweek
-            existing_data = db_manager.get_fpl_data(gameweek)
-            if not existing_data:
-                print(f"No existing data for gameweek {gameweek}, will refresh")
-                return True
-            
-            # Check if data is recent (within last hour)
-            # For now, always refresh - you could implement more sophisticated logic here
-            return True
-            
-        except Exception as e:
-            print(f"Error checking if data should be refreshed: {e}")
-            return True
-    
-    def refresh_gameweek_data(self, gameweek):
-        """Refresh data for a specific gameweek."""
+    def refresh_gameweek_data(self, gameweek, with_awards=False):
+        """Refresh data for a specific gameweek; with_awards also calculates its awards and returns that result."""
         try:
             print(f"Refreshing data for gameweek {gameweek}...")
             
@@ -152,11 +192,15 @@ class FPLDataServer:
                 }
                 teams_data.append(team_data)
             
-            # Save to database
-            db_manager.save_fpl_data(gameweek, teams_data)
-            
-            print(f"Successfully refreshed data for gameweek {gameweek}")
-            return True
+            # Save to database; only this step waits for other gameweeks' publishes
+            with db_manager.staging():
+                db_manager.save_fpl_data(gameweek, teams_data)
+                print(f"Successfully refreshed data for gameweek {gameweek}")
+                if not with_awards:
+                    return True
+                
+                print(f"Calculating awards for gameweek {gameweek}")
+                return self.calculate_gameweek_awards(gameweek)
         
         except Exception as e:
             print(f"Error refreshing data for gameweek {gameweek}: {e}")
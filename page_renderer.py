@@ -0,0 +1,51 @@
+import threading
+import time
+from static_assets import static_assets, Asset
+from read_model import read_model
+
+# Marker the embedded state is inserted before: the page's own script tag
+_SCRIPT_TAG = b'<script src="/script.'
+
+class PageRenderer:
+    """Serve index.html with the first screen's data already in it.
+
+    The /api/initial-state payload (gameweek list, current gameweek, its
+    compact standings and awards, award badges) is embedded as an inline
+    JSON script, so script.js can draw the table without any API call.
+    A page is rendered only when the template or that payload changes;
+    every other request reuses it with its precompressed variants.
+    """
+
+    def __init__(self, template='index.html'):
+        self.template = template
+        self._lock = threading.Lock()
+        self._rendered = None  # (template digest, initial-state response, Asset)
+
+    def render(self, current_gameweek, source):
+        """The rendered page as an Asset, or the plain template if rendering is not possible."""
+        page = static_assets.get(self.template)
+        if page is None:
+            return None
+        state = read_model.get_initial_response(current_gameweek, source)
+        cached = self._rendered
+        if cached and cached[0] == page.digest and cached[1] is state:
+            return cached[2]
+        with self._lock:
+            cached = self._rendered
+            if cached and cached[0] == page.digest and cached[1] is state:
+                return cached[2]
+            position = page.body.find(_SCRIPT_TAG)
+            if position < 0:
+                return page
+            # Escaping '<' keeps the JSON valid and stops it from closing the script element
+            data = state.body.replace(b'<', b'\\u003c')
+            embedded = b'<script id="initial-state" type="application/json">' + data + b'</script>\n  '
+            body = page.body[:position] + embedded + page.body[position:]
+            # The data changed even if no file did, so the page is as new as this render
+            asset = Asset(page.name, page.content_type, body, page.mtime, page.dependencies, time.time())
+            self._rendered = (page.digest, state, asset)
+            print(f"Rendered {self.template} for gameweek {current_gameweek}")
+            return asset
+
+# Global page renderer instance
+page_renderer = PageRenderer()
@@ -0,0 +1,145 @@
+import os
+import signal
+import socket
+import threading
+import time
+from config import Config
+
+class PreforkServer:
+    """Run several worker processes that accept on one shared listening socket.
+
+    The parent binds the port, forks ``workers`` children and supervises them:
+    crashed workers are replaced, SIGHUP replaces every worker one at a time
+    (rolling restart) and SIGTERM/SIGINT stop them gracefully. Each worker
+    serves requests with its own threads, caches and database connections.
+    """
+
+    def __init__(self, port, workers, worker_main):
+        self.port = port
+        self.workers = workers
+        self.worker_main = worker_main
+        self.sock = None
+        self._children = {}
+        self._retiring = set()
+        self._stopping = False
+        self._restart_requested = False
+
+    def serve(self):
+        """Bind, fork the workers and supervise them until shutdown."""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('', self.port))
+        self.sock.listen(128)
+        print(f"Pre-fork server listening on port {self.port} with {self.workers} workers")
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_restart)
+
+        for _ in range(self.workers):
+            self._spawn()
+
+        try:
+            while not self._stopping:
+                if self._restart_requested:
+                    self._restart_requested = False
+                    self._rolling_restart()
+                self._reap()
+                time.sleep(0.5)
+        finally:
+            self._shutdown()
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            # Child: the parent coordinates Ctrl-C and restarts
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                self.worker_main(self.sock)
+            except Exception as e:
+                print(f"Worker {os.getpid()} crashed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self._children[pid] = time.time()
+        print(f"Started worker {pid}")
+        return pid
+
+    def _reap(self):
+        """Collect exited workers and replace any that died unexpectedly."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self._children.pop(pid, None)
+            if pid in self._retiring:
+                self._retiring.discard(pid)
+                continue
+            print(f"Worker {pid} exited unexpectedly (status {status})")
+            if not self._stopping:
+                self._spawn()
+
+    def _wait_for(self, pids, timeout):
+        """Wait until the given workers have exited or the timeout passes."""
+        deadline = time.time() + timeout
+        while time.time() < deadline and any(pid in self._children for pid in pids):
+            self._reap()
+            time.sleep(0.1)
+        return [pid for pid in pids if pid in self._children]
+
+    def _rolling_restart(self):
+        """Replace workers one at a time so the socket is always being served."""
+        print("Rolling restart of workers...")
+        for old_pid in list(self._children):
+            if self._stopping:
+                break
+            self._spawn()
+            self._retiring.add(old_pid)
+            self._signal(old_pid, signal.SIGTERM)
+            for pid in self._wait_for([old_pid], Config.WORKER_GRACEFUL_TIMEOUT):
+                self._signal(pid, signal.SIGKILL)
+                self._wait_for([pid], 5)
+        print("Rolling restart complete")
+
+    def _shutdown(self):
+        """Ask every worker to finish, then force any stragglers."""
+        print("Stopping workers...")
+        pids = list(self._children)
+        self._retiring.update(pids)
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+        for pid in self._wait_for(pids, Config.WORKER_GRACEFUL_TIMEOUT):
+            print(f"Worker {pid} did not stop in time, killing it")
+            self._signal(pid, signal.SIGKILL)
+        self._wait_for(pids, 5)
+        self.sock.close()
+        print("All workers stopped")
+
+    def _signal(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_restart(self, signum, frame):
+        self._restart_requested = True
+
+def install_worker_shutdown(httpd):
+    """Make SIGTERM stop a worker's HTTP server from accepting new requests."""
+    def handle_term(signum, frame):
+        # shutdown() blocks until serve_forever() returns, so it must run on another thread
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, handle_term)
+
+def prefork_supported():
+    """Pre-forking needs os.fork (not available on Windows)."""
+    return hasattr(os, 'fork')
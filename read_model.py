@@ -0,0 +1,248 @@
+import threading
+import records
+from database_manager import db_manager
+from records import TeamRecord, StandingRecord, AwardRecord
+from award_types import badge_for, award_types_payload, AWARD_TYPE_CODES, AWARD_TYPES_VERSION
+from compression import CachedResponse
+
+class ReadModel:
+    """All gameweeks' standings, ranks and awards held in memory.
+
+    The whole league history is a few hundred KB, so it is loaded once from
+    the published snapshot and then patched per gameweek whenever a write is
+    published. Read endpoints answer from here without touching SQLite.
+    Rows are slotted records (see records.py) shared by every request; an
+    update replaces a gameweek's entries rather than mutating them, so
+    readers never see a half-applied change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._standings = {}      # gameweek -> (TeamRecords ordered by total points, {team_id: rank})
+        self._awards = {}         # gameweek -> AwardRecords
+        self._player_counts = {}  # gameweek -> player_performance rows
+        self._views = {}          # gameweek -> {compact: CachedResponse for /api/data, 'awards': bytes}, built on first request
+        self._initial = None      # (inputs, CachedResponse) of the last /api/initial-state
+        self._season_awards = None  # CachedResponse for /api/awards/season, dropped on award or team changes
+        db_manager.add_listener(self._on_database_change)
+
+    def ensure_loaded(self):
+        """Load everything on first use."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            with db_manager.get_read_connection() as conn:
+                c = conn.cursor()
+                c.execute('''SELECT gameweek, team_id, team_name, manager_name, gw_points,
+                                    total_points, team_value, bank_balance
+                             FROM fpl_data ORDER BY gameweek, team_id''')
+                teams = {}
+                for row in c.fetchall():
+                    teams.setdefault(row[0], []).append(TeamRecord(*row[1:]))
+                for gameweek, rows in teams.items():
+                    self._set_teams(gameweek, rows)
+
+                c.execute('''SELECT gameweek, award_type, team_id, team_name, manager_name,
+                                    points, additional_data
+                             FROM award_winners ORDER BY gameweek, award_type, team_id''')
+                for row in c.fetchall():
+                    self._awards.setdefault(row[0], []).append(AwardRecord(*row[1:]))
+
+                c.execute('SELECT gameweek, COUNT(*) FROM player_performance GROUP BY gameweek')
+                self._player_counts = dict(c.fetchall())
+            self._loaded = True
+            print(f"Read model loaded {len(self._standings)} gameweeks")
+
+    def _set_teams(self, gameweek, rows):
+        """Store a gameweek's teams ordered by total points, with league ranks."""
+        # Rank changes of the next gameweek depend on this one
+        self._views.pop(gameweek, None)
+        self._views.pop(gameweek + 1, None)
+        if not rows:
+            self._standings.pop(gameweek, None)
+            return
+        ordered = sorted(rows, key=lambda r: r.total_points, reverse=True)
+        ranks = {}
+        current_rank = 1
+        for i, team in enumerate(ordered):
+            if i > 0 and team.total_points < ordered[i-1].total_points:
+                current_rank = i + 1
+            ranks[team.team_id] = current_rank
+        self._standings[gameweek] = (ordered, ranks)
+
+    def _on_database_change(self, table, gameweek):
+        """Reload just the changed part of a gameweek."""
+        if table in ('award_winners', 'fpl_data'):
+            # The season leaderboard shows each team's latest names
+            with self._lock:
+                self._season_awards = None
+        if not self._loaded:
+            # A load in progress holds the lock; wait for it, then apply on top
+            with self._lock:
+                if not self._loaded:
+                    return
+        with db_manager.get_read_connection() as conn:
+            c = conn.cursor()
+            if table == 'fpl_data':
+                c.execute('''SELECT team_id, team_name, manager_name, gw_points,
+                                    total_points, team_value, bank_balance
+                             FROM fpl_data WHERE gameweek = ? ORDER BY team_id''', (gameweek,))
+                rows = [TeamRecord(*row) for row in c.fetchall()]
+                with self._lock:
+                    self._set_teams(gameweek, rows)
+            elif table == 'award_winners':
+                c.execute('''SELECT award_type, team_id, team_name, manager_name, points, additional_data
+                             FROM award_winners WHERE gameweek = ? ORDER BY award_type, team_id''', (gameweek,))
+                rows = [AwardRecord(*row) for row in c.fetchall()]
+                with self._lock:
+                    self._awards[gameweek] = rows
+                    self._views.pop(gameweek, None)
+            elif table == 'player_performance':
+                c.execute('SELECT COUNT(*) FROM player_performance WHERE gameweek = ?', (gameweek,))
+                count = c.fetchone()[0]
+                with self._lock:
+                    self._player_counts[gameweek] = count
+
+    def gameweeks(self):
+        """Gameweeks that have standings, in order."""
+        self.ensure_loaded()
+        return sorted(self._standings)
+
+    def get_teams(self, gameweek):
+        """TeamRecords for a gameweek ordered by total points, or None. Do not modify."""
+        self.ensure_loaded()
+        standings = self._standings.get(gameweek)
+        return standings[0] if standings else None
+
+    def get_ranks(self, gameweek):
+        """Map team_id -> league rank for a gameweek."""
+        self.ensure_loaded()
+        return self._standings.get(gameweek, ((), {}))[1]
+
+    def get_previous_gameweek_data(self, gameweek):
+        """Previous gameweek's points per team (like db_manager.get_previous_gameweek_data)."""
+        self.ensure_loaded()
+        return {team.team_id: {'total_points': team.total_points, 'gw_points': team.gw_points}
+                for team in self._standings.get(gameweek - 1, ((), {}))[0]}
+
+    def get_awards(self, gameweek):
+        """AwardRecords for a gameweek grouped by award type."""
+        self.ensure_loaded()
+        awards = {}
+        for award in self._awards.get(gameweek, []):
+            awards.setdefault(award.award_type, []).append(award)
+        return awards
+
+    def player_count(self, gameweek):
+        """Number of stored player_performance rows for a gameweek."""
+        self.ensure_loaded()
+        return self._player_counts.get(gameweek, 0)
+
+    def get_gameweek_data(self, gameweek, compact=False):
+        """Standings with ranks, rank changes and award badges, plus the awards summary.
+
+        In compact mode each team lists award type codes only; clients look
+        the badges up in /api/award-types. The payload is built once per
+        change and shared; do not modify it.
+        """
+        response = self.get_gameweek_response(gameweek, compact)
+        return response.payload if response else None
+
+    def get_gameweek_response(self, gameweek, compact=False):
+        """The /api/data payload with its cached encoded and compressed bodies, or None."""
+        self.ensure_loaded()
+        view = self._views.get(gameweek, {}).get(compact)
+        if view is None:
+            with self._lock:
+                view = self._views.get(gameweek, {}).get(compact) or self._build_view(gameweek, compact)
+        return view
+
+    def get_gameweek_body(self, gameweek, compact=False):
+        """Encoded /api/data body for a gameweek, or None."""
+        response = self.get_gameweek_response(gameweek, compact)
+        return response.body if response else None
+
+    def get_awards_body(self, gameweek):
+        """A gameweek's awards grouped by type as JSON bytes, encoded once per change."""
+        self.ensure_loaded()
+        body = self._views.get(gameweek, {}).get('awards')
+        if body is None:
+            with self._lock:
+                body = records.dumps(self.get_awards(gameweek)).encode('utf-8')
+                self._views.setdefault(gameweek, {})['awards'] = body
+        return body
+
+    def get_season_awards_response(self):
+        """Season award leaderboard from the award_tally aggregate, cached until awards or teams change."""
+        response = self._season_awards
+        if response is None:
+            with self._lock:
+                response = self._season_awards
+                if response is None:
+                    tally = db_manager.get_award_tally()
+                    order = {code: i for i, code in enumerate(AWARD_TYPE_CODES)}
+                    response = CachedResponse({
+                        'award_types_version': AWARD_TYPES_VERSION,
+                        'awards': {award_type: tally[award_type]
+                                   for award_type in sorted(tally, key=lambda code: (order.get(code, len(order)), code))}
+                    })
+                    self._season_awards = response
+        return response
+
+    def get_initial_response(self, current_gameweek, source):
+        """Everything the page needs on first load, as one cached response.
+
+        Rebuilt only when the gameweek list, the current gameweek or that
+        gameweek's data changes.
+        """
+        data = self.get_gameweek_response(current_gameweek, compact=True) if current_gameweek else None
+        inputs = (current_gameweek, source, tuple(self.gameweeks()), data)
+        cached = self._initial
+        if cached and cached[0] == inputs:
+            return cached[1]
+        response = CachedResponse({
+            'gameweeks': list(inputs[2]),
+            'current_gameweek': current_gameweek,
+            'source': source,
+            'data': data.payload if data else None,
+            'award_types': award_types_payload()
+        })
+        self._initial = (inputs, response)
+        return response
+
+    def _build_view(self, gameweek, compact):
+        standings = self._standings.get(gameweek)
+        if not standings:
+            return None
+        teams, ranks = standings
+        previous_ranks = self._standings.get(gameweek - 1, ((), {}))[1]
+
+        team_awards = {}
+        for award in self._awards.get(gameweek, []):
+            team_awards.setdefault(award.team_id, []).append(
+                award.award_type if compact else badge_for(award.award_type))
+
+        rows = []
+        for team in teams:
+            previous_rank = previous_ranks.get(team.team_id)
+            rank = ranks[team.team_id]
+            rows.append(StandingRecord(team.team_id, team.team_name, team.manager_name, team.gw_points,
+                                       team.total_points, team.team_value, team.bank_balance,
+                                       rank, previous_rank - rank if previous_rank else 0,
+                                       team_awards.get(team.team_id, [])))
+
+        view = {
+            'standings': rows,
+            'awards': self.get_awards(gameweek)
+        }
+        if compact:
+            view['award_types_version'] = AWARD_TYPES_VERSION
+        response = CachedResponse(view)
+        self._views.setdefault(gameweek, {})[compact] = response
+        return response
+
+# Global read model instance
+read_model = ReadModel()
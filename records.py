@@ -0,0 +1,124 @@
+import json
+
+_encode_value = json.JSONEncoder().encode
+
+class Record:
+    """Fixed-layout record with ``__slots__`` instead of a per-instance dict.
+
+    Subclasses list their attributes in FIELDS (and optionally a subset to
+    serialize in JSON_FIELDS). Records are treated as immutable once built,
+    so each one caches its JSON text the first time it is encoded and shared
+    instances are serialized only once.
+    """
+    __slots__ = ('_json',)
+    FIELDS = ()
+    JSON_FIELDS = None
+
+    def __init__(self, *values):
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+        self._json = None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data.get(name) for name in cls.FIELDS))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in (self.JSON_FIELDS or self.FIELDS)}
+
+    def to_json(self):
+        """JSON object text for this record, built once."""
+        if self._json is None:
+            parts = []
+            for name in (self.JSON_FIELDS or self.FIELDS):
+                parts.append(',' if parts else '{')
+                parts.append(_encode_value(name))
+                parts.append(':')
+                _encode(getattr(self, name), parts)
+            parts.append('}' if parts else '{}')
+            self._json = ''.join(parts)
+        return self._json
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class TeamRecord(Record):
+    """A team's stored standings row for one gameweek."""
+    FIELDS = ('team_id', 'team_name', 'manager_name', 'gw_points', 'total_points', 'team_value', 'bank_balance')
+    __slots__ = FIELDS
+
+class StandingRecord(TeamRecord):
+    """A standings row as served to clients: team, league rank, rank change and badges."""
+    FIELDS = TeamRecord.FIELDS + ('overall_rank', 'rank_change', 'awards')
+    __slots__ = ('overall_rank', 'rank_change', 'awards')
+
+class HistoryRecord(Record):
+    """One gameweek of a team's season history."""
+    FIELDS = ('gameweek', 'gw_points', 'total_points', 'overall_rank', 'rank_change', 'awards')
+    __slots__ = FIELDS
+
+class AwardRecord(Record):
+    """One award winner for a gameweek."""
+    FIELDS = ('award_type', 'team_id', 'team_name', 'manager_name', 'points', 'details')
+    JSON_FIELDS = ('team_id', 'team_name', 'manager_name', 'points')
+    __slots__ = FIELDS
+
+class BadgeRecord(Record):
+    """Display metadata for an award type; one shared instance per type."""
+    FIELDS = ('type', 'emoji', 'color', 'text')
+    __slots__ = FIELDS
+
+class PickRecord(Record):
+    """One squad pick: element id, squad position (1-15) and armband."""
+    FIELDS = ('element', 'position', 'is_captain', 'is_vice_captain')
+    __slots__ = FIELDS
+
+def _encode_key(key):
+    """JSON text of a dict key, converted to a string the way json.dumps does."""
+    if isinstance(key, str):
+        return _encode_value(key)
+    if key is None or isinstance(key, (bool, int, float)):
+        # json.dumps writes None/True/False as null/true/false and numbers as their JSON text
+        return _encode_value(_encode_value(key))
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
+
+def _encode(value, parts):
+    """Append the JSON text of value to parts, reusing records' cached text."""
+    if isinstance(value, Record):
+        parts.append(value.to_json())
+    elif isinstance(value, dict):
+        parts.append('{')
+        first = True
+        for key, item in value.items():
+            if not first:
+                parts.append(',')
+            first = False
+            parts.append(_encode_key(key))
+            parts.append(':')
+            _encode(item, parts)
+        parts.append('}')
+    elif isinstance(value, (list, tuple)):
+        parts.append('[')
+        for i, item in enumerate(value):
+            if i:
+                parts.append(',')
+            _encode(item, parts)
+        parts.append(']')
+    else:
+        parts.append(_encode_value(value))
+
+def dumps(value):
+    """Serialize dicts, lists and records to compact JSON text, splicing in records' cached text.
+
+    Worth it for cached views built from shared records; one-off payloads
+    are faster through json.dumps with json_default.
+    """
+    parts = []
+    _encode(value, parts)
+    return ''.join(parts)
+
+def json_default(value):
+    """``default`` hook for json.dumps: encode records as their fields."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
@@ -0,0 +1,181 @@
+import threading
+import time
+from datetime import datetime
+from config import Config
+from database_manager import db_manager
+from fpl_api import fpl_api
+from gameweek_resolver import gameweek_resolver, parse_deadline
+
+# Job kinds, in the order they happen within a gameweek
+PICKS = 'picks'    # cache every team's picks once the deadline has passed
+LIVE = 'live'      # poll live points while matches are being played
+FINAL = 'final'    # refresh standings and awards once bonus points are confirmed
+CHECK = 'check'    # nothing to run yet, just re-plan at this time
+
+class RefreshScheduler:
+    """Plan upstream refreshes around event deadlines and fixture kickoffs.
+
+    Instead of polling every hour, the scheduler reads the event calendar and
+    the gameweek's fixtures and schedules work only when something can have
+    changed: picks after the deadline, live points during match windows and
+    the final standings after bonus points are confirmed. During international
+    breaks the next job is simply the next deadline.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._handlers = {}
+        self._completed = set()
+        self._last_live_poll = {}
+        self._fixtures = {}
+        self._jobs = []
+        self.last_run = None
+
+    def set_handler(self, kind, handler):
+        """Register the callable handler(gameweek) that performs a job kind."""
+        self._handlers[kind] = handler
+
+    def wake(self):
+        """Interrupt the current wait so jobs are re-planned immediately."""
+        self._wake.set()
+
+    def upcoming(self):
+        """Return the currently planned jobs for display."""
+        with self._lock:
+            return [{
+                'kind': job['kind'],
+                'gameweek': job['gameweek'],
+                'due': datetime.fromtimestamp(job['due']).isoformat(timespec='seconds'),
+                'reason': job['reason']
+            } for job in self._jobs]
+
+    def _job(self, kind, gameweek, due, reason):
+        return {'kind': kind, 'gameweek': gameweek, 'due': due, 'reason': reason}
+
+    def _is_done(self, kind, gameweek):
+        if (kind, gameweek) in self._completed:
+            return True
+        if kind == PICKS:
+            # Picks survive restarts in player_performance
+            with db_manager.get_read_connection() as conn:
+                c = conn.cursor()
+                c.execute('SELECT COUNT(*) FROM player_performance WHERE gameweek = ?', (gameweek,))
+                return c.fetchone()[0] > 0
+        return False
+
+    def plan(self, now=None):
+        """Build the job list from the event calendar and fixtures."""
+        now = now or time.time()
+        events = gameweek_resolver.get_events()
+        if not events:
+            jobs = [self._job(CHECK, None, now + Config.SCHEDULER_RETRY_SECONDS, 'event calendar unavailable')]
+            with self._lock:
+                self._jobs = jobs
+            return jobs
+
+        jobs = []
+        started = [e for e in events if e['deadline'] and e['deadline'] <= now]
+        upcoming = [e for e in events if e['deadline'] and e['deadline'] > now]
+
+        if started:
+            event = started[-1]
+            gameweek = event['id']
+            if not self._is_done(PICKS, gameweek):
+                jobs.append(self._job(PICKS, gameweek,
+                                      max(now, event['deadline'] + Config.PICKS_DELAY_SECONDS),
+                                      'deadline passed'))
+            if not self._is_done(FINAL, gameweek):
+                jobs.extend(self._plan_matches(gameweek, event, now))
+
+        if upcoming:
+            event = upcoming[0]
+            jobs.append(self._job(PICKS, event['id'],
+                                  event['deadline'] + Config.PICKS_DELAY_SECONDS,
+                                  'next deadline'))
+
+        if not jobs:
+            jobs.append(self._job(CHECK, None, now + Config.SCHEDULER_MAX_SLEEP_SECONDS, 'season over'))
+
+        jobs.sort(key=lambda j: j['due'])
+        with self._lock:
+            self._jobs = jobs
+        return jobs
+
+    def _plan_matches(self, gameweek, event, now):
+        """Live polling during match windows, then the final refresh."""
+        fixtures = self._get_fixtures(gameweek, now)
+        kickoffs = sorted(k for k in (parse_deadline(f.get('kickoff_time')) for f in fixtures) if k)
+        window = Config.MATCH_WINDOW_MINUTES * 60
+
+        # Bonus points are confirmed once every fixture is marked finished
+        confirmed = event['data_checked'] or (fixtures and all(f.get('finished') for f in fixtures))
+        if confirmed:
+            return [self._job(FINAL, gameweek, now, 'bonus points confirmed')]
+
+        jobs = []
+        in_window = any(k <= now < k + window for k in kickoffs)
+        if in_window:
+            last_poll = self._last_live_poll.get(gameweek, 0)
+            jobs.append(self._job(LIVE, gameweek, max(now, last_poll + Config.LIVE_REFRESH_SECONDS),
+                                  'match in progress'))
+        else:
+            next_kickoff = next((k for k in kickoffs if k > now), None)
+            if next_kickoff:
+                jobs.append(self._job(LIVE, gameweek, next_kickoff, 'next kickoff'))
+
+        last_end = (kickoffs[-1] + window) if kickoffs else now
+        jobs.append(self._job(CHECK, gameweek,
+                              max(now + Config.SCHEDULER_RETRY_SECONDS, last_end + Config.BONUS_DELAY_SECONDS),
+                              'waiting for bonus points'))
+        return jobs
+
+    def _get_fixtures(self, gameweek, now):
+        """Fixtures for a gameweek, reused briefly so planning twice per cycle costs one fetch."""
+        cached = self._fixtures.get(gameweek)
+        if cached and now - cached[0] < 60:
+            return cached[1]
+        fixtures = fpl_api.get_fixtures(gameweek) or []
+        self._fixtures[gameweek] = (now, fixtures)
+        return fixtures
+
+    def run_due_jobs(self, now=None):
+        """Run every job whose time has come; return the seconds until the next one."""
+        now = now or time.time()
+        jobs = self.plan(now)
+        for job in jobs:
+            if job['due'] > now or job['kind'] == CHECK:
+                continue
+            handler = self._handlers.get(job['kind'])
+            if not handler:
+                continue
+            print(f"Scheduler running {job['kind']} job for gameweek {job['gameweek']} ({job['reason']})")
+            try:
+                if job['kind'] == LIVE:
+                    self._last_live_poll[job['gameweek']] = now
+                if handler(job['gameweek']) is not False and job['kind'] in (PICKS, FINAL):
+                    self._completed.add((job['kind'], job['gameweek']))
+            except Exception as e:
+                print(f"Scheduler job {job['kind']} for gameweek {job['gameweek']} failed: {e}")
+            self.last_run = time.time()
+
+        jobs = self.plan()
+        next_due = min(j['due'] for j in jobs)
+        wait = min(max(next_due - time.time(), 1), Config.SCHEDULER_MAX_SLEEP_SECONDS)
+        print(f"Scheduler: next job {jobs[0]['kind']} for gameweek {jobs[0]['gameweek']} "
+              f"in {int(wait)}s ({jobs[0]['reason']})")
+        return wait
+
+    def run(self, is_running):
+        """Loop until is_running() returns False, sleeping until the next job."""
+        while is_running():
+            try:
+                wait = self.run_due_jobs()
+            except Exception as e:
+                print(f"Error in refresh scheduler: {e}")
+                wait = Config.SCHEDULER_RETRY_SECONDS
+            self._wake.wait(wait)
+            self._wake.clear()
+
+# Global refresh scheduler instance
+refresh_scheduler = RefreshScheduler()
@@ -7,11 +7,22 @@ const API_BASE_URL = isProduction
 console.log(`Environment: ${isProduction ? 'Production' : 'Local Development'}`);
 console.log(`API Base URL: ${API_BASE_URL}`);
 
+// Currently displayed gameweek data, kept so pushed diffs can be applied in place
+let currentGameweek = null;
+let currentStandings = [];
+let currentAwards = {};
+const awardBadges = {};
+let awardTypesVersion = null;
+let defaultBadge = { emoji: '🏆', color: 'bg-gray-300 text-gray-800 border-gray-200' };
+
 // Wait for DOM to be fully loaded
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize gameweek data
     initializeGameweekData();
 
+    // Listen for pushed standings/award updates
+    subscribeToUpdates();
+
     // Add event listener for gameweek selector
     const gameweekSelect = document.getElementById('gameweekSelect');
     if (gameweekSelect) {
@@ -64,64 +75,66 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
-// Initialize gameweek data
+// Initialize gameweek data: one request returns the gameweek list, current gameweek and its data
 function initializeGameweekData() {
-    const select = document.getElementById('gameweekSelect');
     const timestamp = new Date().getTime();
     
-    // First load available gameweeks
-    fetch(`${API_BASE_URL}/api/gameweeks?t=${timestamp}`)
-        .then(r => r.json())
-        .then(data => {
-            const gameweeks = Array.isArray(data.gameweeks) ? data.gameweeks : [];
-            if (select) {
-                select.innerHTML = '<option value="">Select Gameweek</option>';
-                gameweeks.forEach(gw => {
-                    const option = document.createElement('option');
-                    option.value = gw;
-                    option.textContent = `Gameweek ${gw}`;
-                    select.appendChild(option);
-                });
-            }
+    // A pre-rendered page carries the same state inline, so no request is needed
+    const embedded = document.getElementById('initial-state');
+    if (embedded) {
+        try {
+            applyInitialState(JSON.parse(embedded.textContent));
+            return;
+        } catch (err) {
+            console.error('Embedded state error:', err);
+        }
+    }
 
-            // Try to get current gameweek; fallback to highest available
-            return fetch(`${API_BASE_URL}/api/current-gameweek?t=${timestamp}`)
-                .then(r => r.ok ? r.json() : Promise.reject())
-                .then(d => ({ current: d.current_gameweek, gameweeks }))
-                .catch(() => ({ current: (gameweeks.length ? Math.max(...gameweeks) : null), gameweeks }));
-        })
-        .then(({ current, gameweeks }) => {
-            if (!current && gameweeks.length) current = Math.max(...gameweeks);
-            if (current && select) {
-                select.value = String(current);
-                loadGameweekData(current);
-            }
-        })
+    fetch(`${API_BASE_URL}/api/initial-state?t=${timestamp}`)
+        .then(r => r.json())
+        .then(applyInitialState)
         .catch(err => console.error('Initialization error:', err));
 }
 
+// Fill the gameweek selector and show the current gameweek from an initial-state payload
+function applyInitialState(state) {
+    const select = document.getElementById('gameweekSelect');
+    const gameweeks = Array.isArray(state.gameweeks) ? state.gameweeks : [];
+    if (select) {
+        select.innerHTML = '<option value="">Select Gameweek</option>';
+        gameweeks.forEach(gw => {
+            const option = document.createElement('option');
+            option.value = gw;
+            option.textContent = `Gameweek ${gw}`;
+            select.appendChild(option);
+        });
+    }
+    if (state.award_types) {
+        registerAwardTypes(state.award_types);
+    }
+
+    const current = state.current_gameweek || (gameweeks.length ? Math.max(...gameweeks) : null);
+    if (current && select) {
+        select.value = String(current);
+        if (state.data && state.current_gameweek === current) {
+            showGameweekData(current, state.data);
+        } else {
+            loadGameweekData(current);
+        }
+    }
+}
+
 // Load gameweek data
 function loadGameweekData(gameweek) {
     console.log('Loading data for gameweek:', gameweek);
     // Add timestamp to prevent caching
     const timestamp = new Date().getTime();
-    fetch(`${API_BASE_URL}/api/data/${gameweek}?t=${timestamp}`)
+    fetch(`${API_BASE_URL}/api/data/${gameweek}?compact=1&t=${timestamp}`)
         .then(response => response.json())
-        .then(data => {
-            console.log('Received data:', data);
-            if (data && data.standings) {
-                updateTable(data.standings);
-                updateAwards(data.awards);
-            } else if (data && data.status === 'error') {
-                // Show empty state for no data
-                updateTable([]);
-                updateAwards({});
-                console.log(`No data available for gameweek ${gameweek}: ${data.message}`);
-            } else {
-                updateTable([]);
-                updateAwards({});
-            }
-        })
+        .then(data => data && data.standings
+            ? loadAwardTypes(data.award_types_version).then(() => data)
+            : data)
+        .then(data => showGameweekData(gameweek, data))
         .catch(error => {
             console.error('Error loading gameweek data:', error);
             updateTable([]);
@@ -129,6 +142,115 @@ function loadGameweekData(gameweek) {
         });
 }
 
+// Display a compact /api/data response
+function showGameweekData(gameweek, data) {
+    console.log('Received data:', data);
+    currentGameweek = Number(gameweek);
+    if (data && data.standings) {
+        currentStandings = data.standings;
+        currentAwards = data.awards || {};
+        // Compact responses list award type codes; expand them to badges
+        currentStandings.forEach(team => {
+            team.awards = (team.awards || []).map(badgeFor);
+        });
+        updateTable(data.standings);
+        updateAwards(data.awards);
+    } else if (data && data.status === 'error') {
+        // Show empty state for no data
+        updateTable([]);
+        updateAwards({});
+        console.log(`No data available for gameweek ${gameweek}: ${data.message}`);
+    } else {
+        updateTable([]);
+        updateAwards({});
+    }
+}
+
+// Fetch award badge metadata once per version (the response is cached by the browser)
+function loadAwardTypes(version) {
+    if (version && version === awardTypesVersion) {
+        return Promise.resolve();
+    }
+    return fetch(`${API_BASE_URL}/api/award-types?v=${version || ''}`)
+        .then(response => response.json())
+        .then(registerAwardTypes)
+        .catch(error => console.error('Error loading award types:', error));
+}
+
+// Remember award badge metadata from /api/award-types (or the initial state)
+function registerAwardTypes(data) {
+    data.types.forEach(badge => { awardBadges[badge.type] = badge; });
+    defaultBadge = data.default || defaultBadge;
+    awardTypesVersion = data.version;
+}
+
+// Badge for an award type code
+function badgeFor(type) {
+    return awardBadges[type] || {
+        type,
+        emoji: defaultBadge.emoji,
+        color: defaultBadge.color,
+        text: type.replace(/_/g, ' ').replace(/\b\w/g, c => c.toUpperCase())
+    };
+}
+
+// Subscribe to the server's event stream of standings/award diffs
+function subscribeToUpdates() {
+    if (!window.EventSource) {
+        console.log('EventSource not supported; live updates disabled');
+        return;
+    }
+    const source = new EventSource(`${API_BASE_URL}/api/events`);
+    source.addEventListener('standings', event => {
+        try {
+            applyStandingsDiff(JSON.parse(event.data));
+        } catch (err) {
+            console.error('Failed to apply standings update:', err);
+        }
+    });
+    source.onerror = () => console.log('Update stream interrupted, browser will reconnect');
+}
+
+// Apply a compact standings diff to the displayed gameweek
+function applyStandingsDiff(diff) {
+    const select = document.getElementById('gameweekSelect');
+    if (select && !select.querySelector(`option[value="${diff.gameweek}"]`)) {
+        const option = document.createElement('option');
+        option.value = diff.gameweek;
+        option.textContent = `Gameweek ${diff.gameweek}`;
+        select.appendChild(option);
+    }
+    if (diff.gameweek !== currentGameweek) return;
+
+    const byId = {};
+    currentStandings.forEach(team => { byId[team.team_id] = team; });
+    const unknownTeam = diff.teams.some(row => !byId[row[0]]);
+    if (unknownTeam || (diff.removed && diff.removed.length)) {
+        // Team list changed; fetch the full gameweek once
+        loadGameweekData(diff.gameweek);
+        return;
+    }
+
+    diff.teams.forEach(row => {
+        const team = byId[row[0]];
+        diff.fields.forEach((field, i) => { team[field] = row[i]; });
+    });
+
+    if (diff.awards) {
+        currentAwards = diff.awards;
+        const typesByTeam = {};
+        Object.entries(diff.awards).forEach(([type, winners]) => {
+            winners.forEach(w => (typesByTeam[w.team_id] = typesByTeam[w.team_id] || []).push(type));
+        });
+        currentStandings.forEach(team => {
+            team.awards = (typesByTeam[team.team_id] || []).map(badgeFor);
+        });
+    }
+
+    updateTable(currentStandings);
+    updateAwards(currentAwards);
+}
+
 // Update table with data
 function updateTable(data) {
     console.log('updateTable called with data:', data);
@@ -0,0 +1,193 @@
+import threading
+import numpy as np
+from database_manager import db_manager
+
+# Array dimensions: gameweek axis is indexed directly by gameweek number
+MAX_GAMEWEEKS = 38
+SQUAD_SIZE = 15
+STARTING_XI = 11
+
+# Chip codes stored per team per gameweek
+CHIP_CODES = {
+    '': 0,
+    'bboost': 1,
+    '3xc': 2,
+    'freehit': 3,
+    'wildcard': 4
+}
+
+class SeasonStore:
+    """In-memory columnar copy of player_performance.
+
+    Picks are held as team x gameweek x squad-slot NumPy arrays so season-wide
+    questions become array reductions instead of a query per team per gameweek.
+    Slot ``s`` holds the player picked at squad position ``s + 1``; empty slots
+    have element id 0.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._dirty_gameweeks = set()
+        self._team_index = {}
+        self.team_ids = np.zeros(0, dtype=np.int64)
+        self._allocate(0)
+        db_manager.add_listener(self._on_database_change)
+
+    def _allocate(self, team_count):
+        """Allocate empty arrays for the given number of teams."""
+        shape = (team_count, MAX_GAMEWEEKS + 1, SQUAD_SIZE)
+        self.element_ids = np.zeros(shape, dtype=np.int32)
+        self.element_types = np.zeros(shape, dtype=np.int8)
+        self.points = np.zeros(shape, dtype=np.int16)
+        self.captains = np.zeros(shape, dtype=bool)
+        self.chips = np.zeros(shape[:2], dtype=np.int8)
+
+    def _grow(self, new_team_ids):
+        """Add rows for teams we have not seen before."""
+        added = [tid for tid in new_team_ids if tid not in self._team_index]
+        if not added:
+            return
+        extra = len(added)
+        for tid in added:
+            self._team_index[tid] = len(self._team_index)
+        self.team_ids = np.concatenate([self.team_ids, np.array(added, dtype=np.int64)])
+        pad = ((0, extra), (0, 0), (0, 0))
+        self.element_ids = np.pad(self.element_ids, pad)
+        self.element_types = np.pad(self.element_types, pad)
+        self.points = np.pad(self.points, pad)
+        self.captains = np.pad(self.captains, pad)
+        self.chips = np.pad(self.chips, pad[:2])
+
+    def _on_database_change(self, table, gameweek):
+        """Mark a gameweek for reload when its picks are rewritten."""
+        if table == 'player_performance':
+            with self._lock:
+                self._dirty_gameweeks.add(gameweek)
+
+    def _fetch_rows(self, gameweek=None):
+        """Read player_performance rows, optionally for a single gameweek."""
+        query = '''SELECT team_id, gameweek, position, player_id, element_type,
+                          gw_points, is_captain, chips_used
+                   FROM player_performance'''
+        params = ()
+        if gameweek is not None:
+            query += ' WHERE gameweek = ?'
+            params = (gameweek,)
+        with db_manager.get_read_connection() as conn:
+            c = conn.cursor()
+            c.execute(query, params)
+            return c.fetchall()
+
+    def _apply_rows(self, rows):
+        """Scatter database rows into the arrays."""
+        rows = [r for r in rows
+                if 1 <= (r[1] or 0) <= MAX_GAMEWEEKS and 1 <= (r[2] or 0) <= SQUAD_SIZE]
+        if not rows:
+            return
+        self._grow(sorted({r[0] for r in rows}))
+
+        team_idx = np.fromiter((self._team_index[r[0]] for r in rows), dtype=np.int64, count=len(rows))
+        gw_idx = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+        slot_idx = np.fromiter((r[2] - 1 for r in rows), dtype=np.int64, count=len(rows))
+
+        self.element_ids[team_idx, gw_idx, slot_idx] = [r[3] or 0 for r in rows]
+        self.element_types[team_idx, gw_idx, slot_idx] = [r[4] or 0 for r in rows]
+        self.points[team_idx, gw_idx, slot_idx] = [r[5] or 0 for r in rows]
+        self.captains[team_idx, gw_idx, slot_idx] = [bool(r[6]) for r in rows]
+        self.chips[team_idx, gw_idx] = [CHIP_CODES.get(r[7] or '', 0) for r in rows]
+
+    def _clear_gameweek(self, gameweek):
+        """Reset every team's slots for a gameweek."""
+        self.element_ids[:, gameweek, :] = 0
+        self.element_types[:, gameweek, :] = 0
+        self.points[:, gameweek, :] = 0
+        self.captains[:, gameweek, :] = False
+        self.chips[:, gameweek] = 0
+
+    def ensure_loaded(self):
+        """Load lazily on first use and refresh any gameweeks rewritten since."""
+        with self._lock:
+            if not self._loaded:
+                print("Loading season picks store from player_performance...")
+                self._dirty_gameweeks.clear()
+                self._apply_rows(self._fetch_rows())
+                self._loaded = True
+                print(f"Season store loaded: {len(self.team_ids)} teams")
+                return
+
+            while self._dirty_gameweeks:
+                gameweek = self._dirty_gameweeks.pop()
+                if not 1 <= gameweek <= MAX_GAMEWEEKS:
+                    continue
+                self._clear_gameweek(gameweek)
+                self._apply_rows(self._fetch_rows(gameweek))
+                print(f"Season store refreshed gameweek {gameweek}")
+
+    def team_index(self, team_id):
+        """Return the array row for a team, or None if it has no picks."""
+        self.ensure_loaded()
+        with self._lock:
+            return self._team_index.get(team_id)
+
+    def has_picks(self):
+        """Return a team x gameweek mask of cells that hold a squad."""
+        self.ensure_loaded()
+        with self._lock:
+            return (self.element_ids > 0).any(axis=2)
+
+    def squads(self, gameweek):
+        """Team ids and their squads (teams x 15 element ids) for teams with picks in a gameweek."""
+        self.ensure_loaded()
+        with self._lock:
+            if not 1 <= gameweek <= MAX_GAMEWEEKS:
+                return self.team_ids[:0], self.element_ids[:0, 0, :]
+            squads = self.element_ids[:, gameweek, :]
+            present = (squads > 0).any(axis=1)
+            return self.team_ids[present].copy(), squads[present].copy()
+
+    def wall_points(self):
+        """GKP + DEF points from the starting XI, per team per gameweek."""
+        self.ensure_loaded()
+        with self._lock:
+            starters = self.points[:, :, :STARTING_XI]
+            defensive = np.isin(self.element_types[:, :, :STARTING_XI], (1, 2))
+            return np.where(defensive, starters, 0).sum(axis=2)
+
+    def bench_points(self):
+        """Points left on the bench, per team per gameweek (0 with Bench Boost)."""
+        self.ensure_loaded()
+        with self._lock:
+            bench = self.points[:, :, STARTING_XI:].sum(axis=2)
+            return np.where(self.chips == CHIP_CODES['bboost'], 0, bench)
+
+    def captain_points(self):
+        """Captain's points, per team per gameweek."""
+        self.ensure_loaded()
+        with self._lock:
+            return np.where(self.captains, self.points, 0).sum(axis=2)
+
+    def starting_points(self):
+        """Sum of starting XI points, per team per gameweek."""
+        self.ensure_loaded()
+        with self._lock:
+            return self.points[:, :, :STARTING_XI].sum(axis=2)
+
+    def season_totals(self):
+        """Per-team season sums of the pick-based award metrics."""
+        self.ensure_loaded()
+        with self._lock:
+            gameweeks = self.has_picks().sum(axis=1)
+            wall = self.wall_points().sum(axis=1)
+            bench = self.bench_points().sum(axis=1)
+            captain = self.captain_points().sum(axis=1)
+            return [{
+                'team_id': int(team_id),
+                'gameweeks': int(gameweeks[i]),
+                'wall_points': int(wall[i]),
+                'bench_points': int(bench[i]),
+                'captain_points': int(captain[i])
+            } for i, team_id in enumerate(self.team_ids)]
+
+# Global season store instance
+season_store = SeasonStore()
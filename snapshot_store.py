@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from config import Config
+
+POINTER_FILE = 'CURRENT'
+
+class SnapshotStore:
+    """Read-only copies of the database that request handlers read from.
+
+    Ingest writes to the main database file, which acts as the staging copy.
+    ``publish()`` copies it with the SQLite online backup API into a new
+    snapshot file and then atomically repoints ``CURRENT`` at it, so readers
+    always see one complete, consistent version and never wait on a writer.
+    The previous snapshots are kept so a bad ingest can be rolled back.
+    """
+
+    def __init__(self, db_path, snapshot_dir=None, keep=None):
+        self.db_path = db_path
+        self.snapshot_dir = snapshot_dir or Config.SNAPSHOT_DIR
+        self.keep = keep or Config.SNAPSHOT_KEEP
+        self._lock = threading.Lock()
+        self._pointer_stat = None
+        self._current = None
+
+    def _path(self, name):
+        return os.path.join(self.snapshot_dir, name)
+
+    def _version_of(self, name):
+        """Snapshot names look like snapshot-<data version>-<id>.db."""
+        try:
+            return int(name.split('-')[1])
+        except (IndexError, ValueError):
+            return -1
+
+    def list_snapshots(self):
+        """Published snapshot names, oldest first."""
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        names = [n for n in os.listdir(self.snapshot_dir) if n.startswith('snapshot-') and n.endswith('.db')]
+        return sorted(names, key=lambda n: (self._version_of(n), n))
+
+    def current_name(self):
+        """Name of the published snapshot, re-read only when CURRENT changes."""
+        pointer = self._path(POINTER_FILE)
+        try:
+            st = os.stat(pointer)
+        except FileNotFoundError:
+            return None
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if key != self._pointer_stat:
+            with open(pointer) as f:
+                self._current = f.read().strip()
+            self._pointer_stat = key
+        return self._current
+
+    def current_path(self):
+        """Path of the published snapshot, or None if nothing was published yet."""
+        name = self.current_name()
+        if name and os.path.exists(self._path(name)):
+            return self._path(name)
+        return None
+
+    def connect(self):
+        """Open a read-only connection to the published snapshot."""
+        path = self.current_path()
+        if path is None:
+            return None
+        # Published snapshots never change, so SQLite can skip locking entirely
+        uri = Path(path).absolute().as_uri() + '?mode=ro&immutable=1'
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _point_to(self, name):
+        """Atomically make a snapshot the one readers open."""
+        tmp = self._path(f'.{POINTER_FILE}.{os.getpid()}.{uuid.uuid4().hex[:8]}')
+        with open(tmp, 'w') as f:
+            f.write(name)
+        os.replace(tmp, self._path(POINTER_FILE))
+
+    def publish(self):
+        """Copy the staging database into a new snapshot and switch readers to it."""
+        with self._lock:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            tmp = self._path(f'.staging-{os.getpid()}-{uuid.uuid4().hex[:8]}.db')
+            source = sqlite3.connect(self.db_path)
+            target = sqlite3.connect(tmp)
+            try:
+                source.backup(target)
+                c = target.cursor()
+                c.execute('SELECT MAX(version) FROM data_changes')
+                version = c.fetchone()[0] or 0
+            finally:
+                target.close()
+                source.close()
+
+            name = f'snapshot-{version:08d}-{uuid.uuid4().hex[:8]}.db'
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, self._path(name))
+
+            current = self.current_name()
+            if current and self._version_of(current) > version:
+                # Another process already published newer data
+                self._remove(name)
+                return current
+
+            self._point_to(name)
+            self._prune()
+            print(f"Published database snapshot {name}")
+            return name
+
+    def previous_name(self):
+        """Name of the snapshot published before the current one, if still retained."""
+        names = self.list_snapshots()
+        current = self.current_name()
+        if current not in names or names.index(current) == 0:
+            return None
+        return names[names.index(current) - 1]
+
+    def discard(self, name):
+        """Delete a snapshot that is no longer current (e.g. after a rollback)."""
+        with self._lock:
+            if name and name != self.current_name():
+                self._remove(name)
+
+    def _prune(self):
+        """Keep the newest snapshots; readers holding removed files keep their handle."""
+        current = self.current_name()
+        for name in self.list_snapshots()[:-self.keep]:
+            if name != current:
+                self._remove(name)
+
+    def _remove(self, name):
+        try:
+            os.remove(self._path(name))
+        except OSError as e:
+            # Windows refuses while a reader has it open; the next prune retries
+            print(f"Could not remove snapshot {name}: {e}")
+
+    def status(self):
+        """Describe the published and retained snapshots."""
+        current = self.current_name()
+        return {
+            'current': current,
+            'version': self._version_of(current) if current else None,
+            'snapshots': self.list_snapshots()
+        }
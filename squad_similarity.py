@@ -0,0 +1,108 @@
+import threading
+import numpy as np
+from database_manager import db_manager
+from season_store import season_store
+from read_model import read_model
+from compression import CachedResponse
+from single_flight import SingleFlight
+
+class SquadSimilarity:
+    """Pairwise squad overlap between all teams in a gameweek.
+
+    Each squad becomes a boolean row over element ids, so one matrix
+    product gives every pair's shared players at once; Jaccard similarity
+    and per-team uniqueness follow from array arithmetic. Results are cached
+    per gameweek until that gameweek's picks change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._cache = {}  # gameweek -> CachedResponse
+        self._versions = {}  # gameweek -> number of picks changes seen
+        db_manager.add_listener(self._on_database_change)
+
+    def _on_database_change(self, table, gameweek):
+        if table == 'player_performance':
+            with self._lock:
+                self._versions[gameweek] = self._versions.get(gameweek, 0) + 1
+                self._cache.pop(gameweek, None)
+
+    def get_response(self, gameweek):
+        """Similarity matrix and uniqueness scores for a gameweek, or None without picks."""
+        response = self._cache.get(gameweek)
+        if response is None:
+            response = self._flight.do(gameweek, self._load, gameweek)
+        return response
+
+    def _load(self, gameweek):
+        with self._lock:
+            response = self._cache.get(gameweek)
+            version = self._versions.get(gameweek, 0)
+        if response is not None:
+            return response
+        response = self._build(gameweek)
+        with self._lock:
+            # Picks that changed during the build may be missing from it: serve it, don't cache it
+            if response is not None and self._versions.get(gameweek, 0) == version:
+                self._cache[gameweek] = response
+        return response
+
+    def compute(self, gameweek):
+        """Team ids, shared-player counts, Jaccard matrix and uniqueness for a gameweek."""
+        team_ids, squads = season_store.squads(gameweek)
+        if len(team_ids) == 0:
+            return None
+        # One column per element id: membership[t, e] is True if team t picked element e
+        membership = np.zeros((len(team_ids), int(squads.max()) + 1), dtype=bool)
+        rows = np.repeat(np.arange(len(team_ids)), squads.shape[1])
+        membership[rows, squads.ravel()] = True
+        membership[:, 0] = False  # empty slots
+
+        counts = membership.astype(np.int32)
+        shared = counts @ counts.T
+        sizes = np.diag(shared)
+        union = sizes[:, None] + sizes[None, :] - shared
+        jaccard = np.divide(shared, union, out=np.zeros(shared.shape), where=union > 0)
+
+        # Uniqueness: 1 - mean Jaccard similarity to every other team
+        others = len(team_ids) - 1
+        if others:
+            mean_similarity = (jaccard.sum(axis=1) - np.diag(jaccard)) / others
+        else:
+            mean_similarity = np.zeros(len(team_ids))
+        return team_ids, shared, jaccard, 1 - mean_similarity
+
+    def _build(self, gameweek):
+        result = self.compute(gameweek)
+        if result is None:
+            return None
+        team_ids, shared, jaccard, uniqueness = result
+        names = {team.team_id: team for team in read_model.get_teams(gameweek) or []}
+
+        # Closest other team per row: mask the diagonal before taking the max
+        others = jaccard.copy()
+        np.fill_diagonal(others, -1)
+        closest = others.argmax(axis=1)
+
+        teams = []
+        for i, team_id in enumerate(team_ids.tolist()):
+            team = names.get(team_id)
+            teams.append({
+                'team_id': team_id,
+                'team_name': team.team_name if team else None,
+                'manager_name': team.manager_name if team else None,
+                'uniqueness': round(float(uniqueness[i]), 3),
+                'closest_team_id': int(team_ids[closest[i]]) if len(team_ids) > 1 else None,
+                'closest_shared': int(shared[i, closest[i]]) if len(team_ids) > 1 else 0
+            })
+        print(f"Computed squad similarity for {len(teams)} teams in gameweek {gameweek}")
+        return CachedResponse({
+            'gameweek': gameweek,
+            'teams': teams,
+            'shared_players': shared.tolist(),
+            'jaccard': np.round(jaccard, 3).tolist()
+        })
+
+# Global squad similarity instance
+squad_similarity = SquadSimilarity()
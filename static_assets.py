@@ -0,0 +1,173 @@
+import hashlib
+import os
+import re
+import threading
+from email.utils import formatdate
+from compression import compress, supported_encodings
+
+# Content types of the files we serve; anything else is not a static asset
+ASSET_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.ico': 'image/x-icon',
+    '.webp': 'image/webp'
+}
+
+# Types worth compressing (raster images are already compressed)
+COMPRESSIBLE = {'.html', '.js', '.css', '.svg'}
+
+# Local src/href references in HTML that get rewritten to hashed URLs
+_REFERENCE = re.compile(r'(src|href)="([^"/:?#][^":?#]*)"')
+
+# Hashed names look like script.1a2b3c4d.js
+_HASHED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{8})(?P<ext>\.[A-Za-z0-9]+)$')
+
+class Asset:
+    """One static file held in memory with validators and precompressed variants."""
+    __slots__ = ('name', 'content_type', 'body', 'digest', 'etag', 'last_modified',
+                 'mtime', 'modified', 'variants', 'dependencies')
+
+    def __init__(self, name, content_type, body, mtime, dependencies=None, modified=None):
+        self.name = name
+        self.content_type = content_type
+        self.body = body
+        self.digest = hashlib.sha1(body).hexdigest()
+        self.etag = f'"{self.digest[:16]}"'
+        # A page is as new as the newest asset it references
+        self.modified = max(mtime, modified or 0)
+        self.last_modified = formatdate(self.modified, usegmt=True)
+        self.mtime = mtime
+        self.dependencies = dependencies or {}
+        self.variants = {}
+        if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+            for encoding in supported_encodings():
+                compressed = compress(body, encoding)
+                if len(compressed) < len(body):
+                    self.variants[encoding] = compressed
+
+    @property
+    def hashed_name(self):
+        stem, ext = os.path.splitext(self.name)
+        return f"{stem}.{self.digest[:8]}{ext}"
+
+class StaticAssetStore:
+    """Serve the frontend files from memory.
+
+    Files are read and precompressed once, then reloaded only when their
+    mtime changes. HTML pages have their local script/image references
+    rewritten to content-hashed URLs (``script.<hash>.js``), which clients
+    may cache forever; the pages themselves are revalidated with ETags.
+    """
+
+    def __init__(self, root='.'):
+        self.root = os.path.abspath(root)
+        # Re-entrant: loading a page loads the assets it references
+        self._lock = threading.RLock()
+        self._assets = {}
+
+    def _full_path(self, name):
+        """Absolute path of an asset, or None if it would leave the root directory."""
+        full_path = os.path.abspath(os.path.join(self.root, name))
+        if not full_path.startswith(self.root + os.sep):
+            return None
+        return full_path
+
+    def preload(self, directories=('.', 'static')):
+        """Load every servable file in the given directories."""
+        count = 0
+        for directory in directories:
+            full_dir = os.path.join(self.root, directory)
+            if not os.path.isdir(full_dir):
+                continue
+            for filename in sorted(os.listdir(full_dir)):
+                name = os.path.normpath(os.path.join(directory, filename))
+                if os.path.splitext(name)[1].lower() in ASSET_TYPES and self.get(name):
+                    count += 1
+        print(f"Loaded {count} static assets")
+
+    def get(self, name):
+        """Asset for a request path (plain or hashed name), or None if there is no such file."""
+        name = os.path.normpath(name.lstrip('/'))
+        asset = self._get(name)
+        if asset is None:
+            match = _HASHED_NAME.match(os.path.basename(name))
+            if match:
+                plain = os.path.join(os.path.dirname(name), match.group('stem') + match.group('ext'))
+                asset = self._get(os.path.normpath(plain))
+        return asset
+
+    def is_hashed_request(self, name, asset):
+        """True when the request named the asset's current content hash."""
+        return os.path.basename(name) == os.path.basename(asset.hashed_name)
+
+    def url_for(self, name):
+        """Content-hashed URL of an asset (the plain URL if it cannot be loaded)."""
+        asset = self._get(os.path.normpath(name))
+        if asset is None:
+            return '/' + name
+        return '/' + asset.hashed_name.replace(os.sep, '/')
+
+    def _get(self, name):
+        ext = os.path.splitext(name)[1].lower()
+        full_path = self._full_path(name)
+        if ext not in ASSET_TYPES or full_path is None:
+            return None
+        try:
+            mtime = os.stat(full_path).st_mtime
+        except OSError:
+            return None
+
+        asset = self._assets.get(name)
+        if asset is not None and asset.mtime == mtime and not self._dependencies_changed(asset):
+            return asset
+
+        with self._lock:
+            asset = self._assets.get(name)
+            if asset is not None and asset.mtime == mtime and not self._dependencies_changed(asset):
+                return asset
+            try:
+                with open(full_path, 'rb') as f:
+                    body = f.read()
+            except OSError:
+                return None
+            dependencies = {}
+            if ext == '.html':
+                body, dependencies = self._rewrite_references(name, body)
+            modified = max((self._assets[dep].modified for dep in dependencies), default=0)
+            asset = Asset(name, ASSET_TYPES[ext], body, mtime, dependencies, modified)
+            self._assets[name] = asset
+            return asset
+
+    def _dependencies_changed(self, asset):
+        for name, digest in asset.dependencies.items():
+            current = self._get(name)
+            if current is None or current.digest != digest:
+                return True
+        return False
+
+    def _rewrite_references(self, page_name, body):
+        """Point local src/href attributes of an HTML page at hashed URLs."""
+        base = os.path.dirname(page_name)
+        dependencies = {}
+
+        def replace(match):
+            target = os.path.normpath(os.path.join(base, match.group(2)))
+            if os.path.splitext(target)[1].lower() in ('.html', ''):
+                return match.group(0)
+            asset = self._get(target)
+            if asset is None:
+                return match.group(0)
+            dependencies[target] = asset.digest
+            return f'{match.group(1)}="/{asset.hashed_name.replace(os.sep, "/")}"'
+
+        text = _REFERENCE.sub(replace, body.decode('utf-8'))
+        return text.encode('utf-8'), dependencies
+
+# Global static asset store
+static_assets = StaticAssetStore()
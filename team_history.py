@@ -0,0 +1,50 @@
+import threading
+from database_manager import db_manager
+from records import HistoryRecord
+from award_types import AWARD_TYPE_CODES, AWARD_TYPES_VERSION
+from compression import CachedResponse
+
+class TeamHistory:
+    """Season history per team for /api/teams/{team_id}/history.
+
+    All teams are computed together by one window-function query and the
+    responses are kept until the published data version changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = (None, {})  # (data version, {team_id: CachedResponse})
+
+    def get_response(self, team_id):
+        """Cached history response for a team, or None if the team has no stored gameweeks."""
+        version = db_manager.get_data_version()
+        cached_version, responses = self._cache
+        if cached_version != version:
+            with self._lock:
+                cached_version, responses = self._cache
+                if cached_version != version:
+                    responses = self._build()
+                    self._cache = (version, responses)
+        return responses.get(team_id)
+
+    def _build(self):
+        order = {code: i for i, code in enumerate(AWARD_TYPE_CODES)}
+        responses = {}
+        for team_id, rows in db_manager.get_team_histories().items():
+            latest = rows[-1]
+            history = [HistoryRecord(row['gameweek'], row['gw_points'], row['total_points'],
+                                     row['overall_rank'], row['rank_change'],
+                                     sorted(row['awards'], key=lambda code: (order.get(code, len(order)), code)))
+                       for row in rows]
+            responses[team_id] = CachedResponse({
+                'team_id': team_id,
+                'team_name': latest['team_name'],
+                'manager_name': latest['manager_name'],
+                'award_types_version': AWARD_TYPES_VERSION,
+                'history': history
+            })
+        print(f"Built season history for {len(responses)} teams")
+        return responses
+
+# Global team history instance
+team_history = TeamHistory()
@@ -1,12 +1,48 @@
+import base64
+import binascii
+import hashlib
 import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from email.utils import parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
+import records
 from data_processor import data_processor
-from database_manager import db_manager
+from database_manager import db_manager, STANDINGS_SORTS
 from awards_calculator import awards_calculator
 from fpl_api import fpl_api
+from season_store import season_store
+from read_model import read_model
+from records import StandingRecord
+from award_types import award_types_payload, AWARD_TYPES_VERSION
+from compression import CachedResponse, StreamCompressor, negotiate, compress, variant_etag
+from static_assets import static_assets, ASSET_TYPES
+from page_renderer import page_renderer
+from team_history import team_history
+from squad_similarity import squad_similarity
+from config import Config
+from live_scoring import live_scoring
+from event_stream import event_broadcaster
+from single_flight import SingleFlight
+from gameweek_resolver import gameweek_resolver
+from refresh_scheduler import refresh_scheduler
+from write_coordinator import write_coordinator
+from leader_election import leader_election
+
+# Coalesces identical concurrent reads across request threads
+request_flight = SingleFlight()
+
+# Award metadata never changes while the process runs
+award_types_response = CachedResponse(award_types_payload())
+
+# Endpoints that write to the database; only the refresh leader serves them
+INGEST_GET_PATHS = ('/api/refresh/', '/api/refresh-data', '/api/calculate-awards/',
+                    '/api/fetch-players/', '/api/bulk-fetch-players/')
+INGEST_POST_PATHS = ('/api/import-data/', '/api/snapshot/rollback')
 
 class FPLRequestHandler(BaseHTTPRequestHandler):
     
@@ -22,13 +58,33 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
         self.send_response(200)
         self.end_headers()
 
-    def send_json(self, status_code, payload):
-        """Send a JSON response with the given status code and payload."""
+    def send_json(self, status_code, payload, headers=None):
+        """Send a JSON response with the given status code, payload and extra headers."""
         try:
+            if isinstance(payload, CachedResponse):
+                body = payload.body
+            else:
+                # One-off payloads go through the C encoder; cached views splice records' JSON
+                body = json.dumps(payload, default=records.json_default, separators=(',', ':')).encode('utf-8')
+            
+            # Compress larger bodies for clients that accept it; cached responses compress once
+            encoding = self.response_encoding(len(body))
+            if encoding:
+                if isinstance(payload, CachedResponse):
+                    body = payload.encoded(encoding)
+                else:
+                    body = compress(body, encoding)
+            
             self.send_response(status_code)
             self.send_header('Content-type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('Vary', 'Accept-Encoding')
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
             self.end_headers()
-            self.wfile.write(json.dumps(payload).encode('utf-8'))
+            self.wfile.write(body)
         except Exception:
             # As a last resort, avoid crashing the handler
             try:
@@ -38,6 +94,29 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                 self.wfile.write(b'Internal Server Error')
             except Exception:
                 pass
+
+    def response_encoding(self, length):
+        """Content coding send_json uses for a body of the given length, or None."""
+        if length < Config.COMPRESSION_MIN_BYTES:
+            return None
+        return negotiate(self.headers.get('Accept-Encoding'))
+
+    def reject_follower(self):
+        """Send 503 if another live process holds the refresh lease; True if rejected.
+        
+        A free or lapsed lease is taken for the request, so a process with no
+        scheduler running (python3 web_server.py) can still ingest on demand.
+        """
+        if leader_election.try_acquire():
+            return False
+        # Clients cannot address a particular process (pre-fork workers share one socket),
+        # so there is no leader to point at; a retry may land on the leader
+        self.send_json(503, {
+            'status': 'error',
+            'message': 'Another process is running refreshes; retry the request'
+        }, headers={'Retry-After': '1'})
+        return True
+    
     def do_GET(self):
         """Handle GET requests."""
         parsed_url = urlparse(self.path)
@@ -47,10 +126,15 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
         print(f"Received request for path: {path}")
         
         try:
+            if path.startswith(INGEST_GET_PATHS) and self.reject_follower():
+                return
+            
             if path.startswith('/api/data/'):
                 # Extract gameweek from path
                 gameweek = int(path.split('/')[-1])
-                data = self.get_simple_data(gameweek)
+                # compact=1 sends award type codes per team instead of full badges
+                compact = query_params.get('compact', ['0'])[0] == '1'
+                data = request_flight.do(('simple_data', gameweek, compact), self.get_simple_data, gameweek, compact)
                 
                 if data:
                     self.send_json(200, data)
@@ -58,10 +142,117 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                 else:
                     self.send_json(404, {'status': 'error', 'message': f'No data found for gameweek {gameweek}'})
             
+            elif path == '/api/records':
+                # Hall of fame: best scores, climbs, captain hauls and streaks
+                self.send_json(200, db_manager.get_league_records())
+            
+            elif path == '/api/awards/season':
+                # Season award leaderboard: wins per team for each award type
+                self.send_json(200, read_model.get_season_awards_response())
+            
+            elif path in ('/api/data', '/api/awards'):
+                # Many gameweeks in one streamed response: ?gws=1-29 or ?gws=1,5,10-12
+                gameweeks = self.parse_gameweeks(query_params.get('gws', [''])[0])
+                if gameweeks is None:
+                    self.send_json(400, {'status': 'error', 'message': 'Expected gws like 1-29 or 1,5,10-12'})
+                elif path == '/api/data':
+                    compact = query_params.get('compact', ['0'])[0] == '1'
+                    self.stream_gameweeks(gameweeks, 'data', lambda gw: read_model.get_gameweek_body(gw, compact))
+                else:
+                    self.stream_gameweeks(gameweeks, 'awards', read_model.get_awards_body)
+            
+            elif path.startswith('/api/standings/'):
+                # A page of standings: ?limit=&cursor=&sort=total|gw|rank_change|value&awards=1&q=
+                try:
+                    gameweek = int(path.split('/')[-1])
+                except ValueError:
+                    self.send_json(400, {'status': 'error', 'message': 'Invalid gameweek in path'})
+                    return
+                self.send_standings_page(gameweek, query_params)
+            
+            elif path.startswith('/api/gw/') and path.endswith('/ownership'):
+                # League ownership, captaincy and effective ownership per player (?element= for one)
+                try:
+                    gameweek = int(path.split('/')[3])
+                    element = query_params.get('element', [None])[0]
+                    element = int(element) if element else None
+                except ValueError:
+                    self.send_json(400, {'status': 'error', 'message': 'Invalid gameweek or element'})
+                    return
+                teams, players = db_manager.get_ownership(gameweek, element)
+                if teams:
+                    self.send_json(200, {'gameweek': gameweek, 'teams': teams, 'players': players})
+                else:
+                    self.send_json(404, {'status': 'error', 'message': f'No picks stored for gameweek {gameweek}'})
+            
+            elif path.startswith('/api/gw/') and path.endswith('/similarity'):
+                # Pairwise squad overlap (Jaccard) and per-team uniqueness
+                try:
+                    gameweek = int(path.split('/')[3])
+                except ValueError:
+                    self.send_json(400, {'status': 'error', 'message': 'Invalid gameweek in path'})
+                    return
+                data = squad_similarity.get_response(gameweek)
+                if data:
+                    self.send_json(200, data)
+                else:
+                    self.send_json(404, {'status': 'error', 'message': f'No picks stored for gameweek {gameweek}'})
+            
+            elif path == '/api/search':
+                # Prefix, diacritic-insensitive search over team and manager names
+                query = query_params.get('q', [''])[0].strip()
+                try:
+                    limit = int(query_params.get('limit', [Config.SEARCH_LIMIT])[0])
+                except ValueError:
+                    limit = Config.SEARCH_LIMIT
+                if not query:
+                    self.send_json(400, {'status': 'error', 'message': 'Missing search query q'})
+                else:
+                    limit = max(1, min(limit, Config.SEARCH_MAX_LIMIT))
+                    self.send_json(200, {'query': query, 'results': db_manager.search_teams(query, limit)})
+            
+            elif path.startswith('/api/teams/') and path.endswith('/history'):
+                # One team's points, rank, rank change and awards for every gameweek
+                try:
+                    team_id = int(path.split('/')[3])
+                except ValueError:
+                    self.send_json(400, {'status': 'error', 'message': 'Invalid team id in path'})
+                    return
+                data = team_history.get_response(team_id)
+                if data:
+                    self.send_json(200, data)
+                else:
+                    self.send_json(404, {'status': 'error', 'message': f'No history found for team {team_id}'})
+            
+            elif path.startswith('/api/live/'):
+                # Provisional standings computed from the live event feed
+                gameweek = int(path.split('/')[-1])
+                resolved = gameweek_resolver.resolve()
+                live_gameweek = resolved['api_gameweek'] or resolved['current_gameweek']
+                if gameweek != live_gameweek:
+                    self.send_json(404, {'status': 'error', 'message': f'Live scoring is only available for the current gameweek ({live_gameweek})'})
+                    return
+                data = live_scoring.get_live_standings(gameweek)
+                
+                if data:
+                    self.send_json(200, data)
+                else:
+                    # The leader's scheduler is still caching picks; requests never fetch them
+                    self.send_json(503, {'status': 'error', 'message': f'Live standings for gameweek {gameweek} are not ready yet'},
+                                   headers={'Retry-After': str(Config.LIVE_WARMING_RETRY_SECONDS)})
+            
+            elif path == '/api/award-types':
+                # Award badge metadata; a request for the current version can be cached forever
+                self.send_award_types(query_params.get('v', [None])[0])
+            
+            elif path == '/api/events':
+                # Server-Sent Events stream of standings/award diffs
+                self.stream_events()
+            
             elif path.startswith('/api/refresh/'):
                 # Refresh data for a specific gameweek
                 gameweek = int(path.split('/')[-1])
-                success = self.refresh_gameweek_data(gameweek)
+                success = write_coordinator.run(gameweek, 'refresh', self.refresh_gameweek_data, gameweek)
                 
                 if success:
                     self.send_json(200, {'status': 'success', 'message': f'Data refreshed for gameweek {gameweek}'})
@@ -71,7 +262,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
             elif path.startswith('/api/calculate-awards/'):
                 # Calculate awards for a specific gameweek
                 gameweek = int(path.split('/')[-1])
-                success = self.calculate_gameweek_awards(gameweek)
+                success = write_coordinator.run(gameweek, 'awards', self.calculate_gameweek_awards, gameweek)
                 
                 if success:
                     self.send_json(200, {'status': 'success', 'message': f'Awards calculated for gameweek {gameweek}'})
@@ -80,77 +271,47 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
             
             elif path.startswith('/api/gameweeks'):
                 # Get available gameweeks from DB only (no next gameweek)
-                gameweeks = db_manager.get_available_gameweeks()
-                
-                # Only include current gameweek if it has data in the database
-                try:
-                    current_gameweek = fpl_api.get_current_gameweek()
-                    if current_gameweek and (current_gameweek not in gameweeks):
-                        # Check if we have data for current gameweek before adding
-                        current_data = db_manager.get_fpl_data(current_gameweek)
-                        if current_data:
-                            gameweeks.append(current_gameweek)
-                except Exception:
-                    pass
-                
-                gameweeks = sorted(set(gameweeks))
-                self.send_json(200, {'gameweeks': gameweeks})
+                resolved = gameweek_resolver.resolve()
+                self.send_json(200, {'gameweeks': resolved['gameweeks']})
             
             elif path == '/api/current-gameweek':
-                # Get current gameweek with DB fallback/override logic
-                current_gameweek = fpl_api.get_current_gameweek()
-                source = 'api'
-                
-                # Get max available gameweek from DB to prevent showing future empty gameweeks
-                max_db_gameweek = None
-                try:
-                    gameweeks = db_manager.get_available_gameweeks()
-                    if gameweeks:
-                        max_db_gameweek = max(gameweeks)
-                except Exception:
-                    pass
-
-                # If API is ahead of our data, show our latest data
-                if max_db_gameweek is not None:
-                    if current_gameweek is None or current_gameweek > max_db_gameweek:
-                        current_gameweek = max_db_gameweek
-                        source = 'db_latest'
-                
-                # Fallback if everything failed (shouldn't happen if DB has data)
-                if current_gameweek is None:
-                    # Final attempt to just use DB max if not already set
-                    if max_db_gameweek is not None:
-                        current_gameweek = max_db_gameweek
-                        source = 'db_fallback'
-                
-                if current_gameweek is None:
+                # Current gameweek, capped at the latest gameweek we have data for
+                resolved = gameweek_resolver.resolve()
+                if resolved['current_gameweek'] is None:
                     self.send_json(500, {'status': 'error', 'message': 'Could not determine current gameweek'})
                 else:
-                    self.send_json(200, {'current_gameweek': current_gameweek, 'source': source})
+                    self.send_json(200, {'current_gameweek': resolved['current_gameweek'], 'source': resolved['source']})
+            
+            elif path == '/api/snapshot':
+                # Published read snapshot and the ones kept for rollback
+                self.send_json(200, db_manager.snapshots.status())
+            
+            elif path == '/api/initial-state':
+                # Gameweek list, current gameweek and its standings/awards in one round trip
+                resolved = gameweek_resolver.resolve()
+                self.send_json(200, read_model.get_initial_response(resolved['current_gameweek'], resolved['source']))
+            
+            elif path == '/api/schedule':
+                # Upcoming refresh jobs planned by the scheduler
+                self.send_json(200, {'jobs': refresh_scheduler.upcoming()})
             
             elif path == '/api/refresh-data':
                 # Refresh data for current gameweek (fallback to inferred next GW if API blocked)
-                print("Getting current gameweek from FPL API...")
-                current_gameweek = fpl_api.get_current_gameweek()
+                resolved = gameweek_resolver.resolve()
+                current_gameweek = resolved['api_gameweek']
                 print(f"Current gameweek result: {current_gameweek}")
 
                 inferred = False
-                if not current_gameweek:
-                    # Try to infer next GW from DB (max + 1) when API blocked (e.g., 403)
-                    try:
-                        gameweeks = db_manager.get_available_gameweeks()
-                        if gameweeks:
-                            current_gameweek = max(gameweeks) + 1
-                            inferred = True
-                            print(f"Inferred gameweek {current_gameweek} from DB fallback")
-                    except Exception:
-                        pass
+                if not current_gameweek and resolved['max_db_gameweek']:
+                    # Infer next GW from DB (max + 1) when API blocked (e.g., 403)
+                    current_gameweek = resolved['max_db_gameweek'] + 1
+                    inferred = True
+                    print(f"Inferred gameweek {current_gameweek} from DB fallback")
                 
                 if current_gameweek:
-                    success = self.refresh_gameweek_data(current_gameweek)
+                    # Calculate awards after refresh, in the same write
+                    success = write_coordinator.run(current_gameweek, 'refresh+awards', self.refresh_with_awards, current_gameweek)
                     if success:
-                        # Calculate awards after refresh
-                        self.calculate_gameweek_awards(current_gameweek)
                         message = f"Data refreshed for gameweek {current_gameweek}"
                         if inferred:
                             message += " (inferred)"
@@ -166,12 +327,10 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
             elif path.startswith('/api/fetch-players/'):
                 # Fetch player data for a specific gameweek (manual trigger)
                 gameweek = int(path.split('/')[-1])
-                success = self.fetch_player_data_for_gameweek(gameweek)
+                # Recalculate awards once we have player data, in the same write
+                success = write_coordinator.run(gameweek, 'players+awards', self.fetch_players_with_awards, gameweek)
                 
                 if success:
-                    # Recalculate awards now that we have player data
-                    self.calculate_gameweek_awards(gameweek)
-                    
                     self.send_json(200, {'status': 'success', 'message': f'Player data fetched for gameweek {gameweek}. Awards recalculated.'})
                 else:
                     self.send_json(500, {'status': 'error', 'message': f'Failed to fetch player data for gameweek {gameweek}'})
@@ -183,10 +342,14 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                 
                 self.send_json(200, {'gameweek': gameweek, 'availability': availability})
             
+            elif path == '/api/season/picks-summary':
+                # Season-long pick metrics from the in-memory columnar store
+                self.send_json(200, {'teams': season_store.season_totals()})
+            
             elif path.startswith('/api/bulk-fetch-players/'):
                 # Bulk fetch player performance data
                 gameweek = int(path.split('/')[-1])
-                success = self.bulk_fetch_player_data(gameweek)
+                success = write_coordinator.run(gameweek, 'players', self.bulk_fetch_player_data, gameweek)
                 
                 if success:
                     self.send_json(200, {'status': 'success', 'message': f'Player data fetched for gameweek {gameweek}'})
@@ -194,8 +357,16 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                     self.send_json(500, {'status': 'error', 'message': f'Failed to fetch player data for gameweek {gameweek}'})
             
             elif path == '/':
-                # Serve the main HTML page
-                self.serve_static_file('index.html', 'text/html')
+                # Serve the main HTML page, with the current gameweek embedded when enabled
+                if Config.PRERENDER_INDEX:
+                    resolved = gameweek_resolver.resolve()
+                    page = page_renderer.render(resolved['current_gameweek'], resolved['source'])
+                    if page is None:
+                        self.send_error(404, 'File not found')
+                    else:
+                        self.send_asset(page, 'no-cache')
+                else:
+                    self.serve_static_file('index.html')
             
             elif path == '/health':
                 # Simple health check endpoint
@@ -207,35 +378,33 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                     'status': 'healthy',
                     'service': 'FPL Data Server',
                     'timestamp': str(datetime.now()),
+                    'pid': os.getpid(),
+                    'refresh_leader': leader_election.is_leader,
+                    'data_version': db_manager.get_data_version(),
                     'endpoints': [
+                        '/api/initial-state',
                         '/api/current-gameweek',
                         '/api/gameweeks',
-                        '/api/data/{gameweek}'
+                        '/api/data/{gameweek}',
+                        '/api/data?gws=1-29',
+                        '/api/awards?gws=1-29',
+                        '/api/awards/season',
+                        '/api/records',
+                        '/api/standings/{gameweek}?limit=50&sort=total',
+                        '/api/teams/{team_id}/history',
+                        '/api/search?q=',
+                        '/api/gw/{gameweek}/ownership',
+                        '/api/gw/{gameweek}/similarity',
+                        '/api/award-types',
+                        '/api/live/{gameweek}',
+                        '/api/events'
                     ]
                 }
                 self.wfile.write(json.dumps(response).encode('utf-8'))
             
-            elif path.startswith('/static/'):
-                # Serve static files from static directory
-                file_path = path[1:]  # Remove leading slash
-                if file_path.endswith('.css'):
-                    self.serve_static_file(file_path, 'text/css')
-                elif file_path.endswith('.js'):
-                    self.serve_static_file(file_path, 'application/javascript')
-                else:
-                    self.serve_static_file(file_path, 'application/octet-stream')
-            
-            elif path.endswith(('.svg', '.png', '.jpg', '.jpeg', '.gif', '.ico')):
-                # Serve image files directly
-                self.serve_static_file(path[1:], 'image/svg+xml' if path.endswith('.svg') else 'image/png')
-            
-            elif path.endswith('.js'):
-                # Serve JavaScript files directly
-                self.serve_static_file(path[1:], 'application/javascript')
-            
-            elif path.endswith('.css'):
-                # Serve CSS files directly
-                self.serve_static_file(path[1:], 'text/css')
+            elif path.startswith('/static/') or path.endswith(tuple(ASSET_TYPES)):
+                # Static assets are served from memory with their own MIME type
+                self.serve_static_file(path[1:])
             
             else:
                 self.send_json(404, {'status': 'error', 'message': 'Endpoint not found'})
@@ -251,6 +420,9 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
         print(f"Received POST request for path: {path}")
 
         try:
+            if path.startswith(INGEST_POST_PATHS) and self.reject_follower():
+                return
+
             if path.startswith('/api/import-data/'):
                 # Import standings and optional awards for a gameweek
                 try:
@@ -279,11 +451,9 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                     return
 
                 try:
-                    # Save standings
-                    db_manager.save_fpl_data(gameweek, standings)
-                    
-                    # Always calculate all awards (overwrite any provided awards)
-                    calc_ok = self.calculate_gameweek_awards(gameweek)
+                    # Identical payloads arriving together are imported once
+                    operation = f"import:{hashlib.sha1(raw_body).hexdigest()}"
+                    calc_ok = write_coordinator.run(gameweek, operation, self.import_gameweek_data, gameweek, standings)
                     awards_msg = 'all 6 awards calculated' if calc_ok else 'awards calculation failed'
                     
                     self.send_json(200, {'status': 'success', 'message': f'Data imported for gameweek {gameweek} ({awards_msg})'})
@@ -292,30 +462,223 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                     self.send_json(500, {'status': 'error', 'message': f'Failed to import data: {str(e)}'})
                 return
 
+            elif path == '/api/snapshot/rollback':
+                # Undo the last publish: restore the previous snapshot's data and republish it
+                restored = write_coordinator.run(None, 'rollback', db_manager.rollback_snapshot)
+                if restored:
+                    self.send_json(200, {'status': 'success', 'message': f'Rolled back to snapshot {restored}',
+                                         'snapshot': db_manager.snapshots.status()})
+                else:
+                    self.send_json(409, {'status': 'error', 'message': 'No earlier snapshot with different data to roll back to'})
+
             else:
                 self.send_json(404, {'status': 'error', 'message': 'Endpoint not found'})
         except Exception as e:
             print(f"Error handling POST request: {e}")
             self.send_json(500, {'status': 'error', 'message': f'Internal server error: {str(e)}'})
     
-    def serve_static_file(self, file_path, content_type):
-        """Serve a static file."""
+    def refresh_with_awards(self, gameweek):
+        """Refresh a gameweek, then recalculate its awards; True if the refresh succeeded."""
+        return self.refresh_gameweek_data(gameweek, with_awards=True)
+    
+    def fetch_players_with_awards(self, gameweek):
+        """Fetch a gameweek's player data, then recalculate its awards; True if the fetch succeeded."""
+        return self.fetch_player_data_for_gameweek(gameweek, with_awards=True)
+    
+    def import_gameweek_data(self, gameweek, standings):
+        """Save imported standings and recalculate awards; return True if awards succeeded."""
+        with db_manager.staging():
+            # Save standings
+            db_manager.save_fpl_data(gameweek, standings)
+            
+            # Always calculate all awards (overwrite any provided awards)
+            return self.calculate_gameweek_awards(gameweek)
+    
+    def send_award_types(self, requested_version):
+        """Serve award metadata with cache headers keyed on its version."""
+        # Each coding of the body is a different representation with its own validator
+        encoding = self.response_encoding(len(award_types_response.body))
+        etag = variant_etag(f'"{AWARD_TYPES_VERSION}"', encoding)
+        if requested_version == AWARD_TYPES_VERSION:
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'public, max-age=3600'
+        headers = {'Cache-Control': cache_control, 'ETag': etag}
+        
+        if self.is_not_modified(etag):
+            headers['Vary'] = 'Accept-Encoding'
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        self.send_json(200, award_types_response, headers)
+    
+    def send_standings_page(self, gameweek, query_params):
+        """Send one keyset-paginated page of a gameweek's standings."""
+        sort = query_params.get('sort', ['total'])[0]
+        if sort not in STANDINGS_SORTS:
+            self.send_json(400, {'status': 'error', 'message': f"Unknown sort '{sort}', expected one of {', '.join(STANDINGS_SORTS)}"})
+            return
         try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
+            limit = int(query_params.get('limit', [Config.STANDINGS_PAGE_SIZE])[0])
+            cursor = query_params.get('cursor', [None])[0]
+            after = None
+            if cursor:
+                # The cursor is the sort value and team id of the previous page's last row
+                value, team_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+                if not isinstance(value, (int, float)):
+                    raise ValueError(cursor)
+                after = (value, int(team_id))
+        except (ValueError, TypeError, IndexError, binascii.Error):
+            self.send_json(400, {'status': 'error', 'message': 'Invalid limit or cursor'})
+            return
+        limit = max(1, min(limit, Config.STANDINGS_MAX_PAGE_SIZE))
+        
+        rows, next_key = db_manager.get_standings_page(
+            gameweek, sort, limit, after,
+            awards_only=query_params.get('awards', ['0'])[0] == '1',
+            search=query_params.get('q', [''])[0].strip() or None)
+        next_cursor = None
+        if next_key:
+            next_cursor = base64.urlsafe_b64encode(json.dumps(list(next_key)).encode('utf-8')).decode('ascii')
+        self.send_json(200, {
+            'gameweek': gameweek,
+            'sort': sort,
+            'limit': limit,
+            'standings': [StandingRecord.from_dict(row) for row in rows],
+            'next_cursor': next_cursor,
+            'award_types_version': AWARD_TYPES_VERSION
+        })
+    
+    def parse_gameweeks(self, spec):
+        """Stored gameweeks selected by a list like '1-29' or '1,3,5-7', or None if it is malformed."""
+        available = read_model.gameweeks()
+        selected = set()
+        for part in spec.split(','):
+            start, separator, end = part.strip().partition('-')
+            try:
+                start = int(start)
+                end = int(end) if separator else start
+            except ValueError:
+                return None
+            selected.update(gw for gw in available if start <= gw <= end)
+        return sorted(selected)
+    
+    def stream_gameweeks(self, gameweeks, key, body_for):
+        """Stream {"gameweeks": [...], key: {gameweek: body}} one gameweek at a time.
+        
+        Each gameweek's JSON is the read model's cached encoding, so the
+        response is assembled from ready-made pieces and never buffered whole.
+        """
+        encoding = negotiate(self.headers.get('Accept-Encoding'))
+        compressor = StreamCompressor(encoding)
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            # No Content-Length: the body ends when the connection closes
+            self.close_connection = True
             
+            self.wfile.write(compressor.compress(f'{{"gameweeks":{records.dumps(gameweeks)},"{key}":{{'.encode('utf-8')))
+            for i, gameweek in enumerate(gameweeks):
+                prefix = f'{"," if i else ""}"{gameweek}":'.encode('utf-8')
+                self.wfile.write(compressor.compress(prefix + (body_for(gameweek) or b'null')))
+            self.wfile.write(compressor.compress(b'}}') + compressor.finish())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def stream_events(self):
+        """Hold the connection open and forward broadcast events to this client."""
+        subscriber = event_broadcaster.subscribe()
+        try:
             self.send_response(200)
-            self.send_header('Content-type', content_type)
+            self.send_header('Content-type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('X-Accel-Buffering', 'no')
             self.end_headers()
-            self.wfile.write(content)
-        
-        except FileNotFoundError:
+            self.wfile.write(b'retry: 5000\n\n')
+            self.wfile.flush()
+            
+            while event_broadcaster.is_subscribed(subscriber):
+                try:
+                    message = subscriber.get(timeout=15)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle stream
+                    message = b': keepalive\n\n'
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            event_broadcaster.unsubscribe(subscriber)
+    
+    def serve_static_file(self, file_path):
+        """Serve a static file from the in-memory asset store."""
+        asset = static_assets.get(file_path)
+        if asset is None:
             self.send_error(404, 'File not found')
-        except Exception as e:
-            self.send_error(500, f'Error reading file: {str(e)}')
+            return
+        
+        # Hashed URLs change whenever the content does, so they never need revalidating
+        if static_assets.is_hashed_request(file_path, asset):
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'no-cache'
+        self.send_asset(asset, cache_control)
+    
+    def send_asset(self, asset, cache_control):
+        """Send an in-memory asset with validators, answering 304 when the client is current."""
+        encoding = negotiate(self.headers.get('Accept-Encoding'))
+        body = asset.variants.get(encoding)
+        if body is None:
+            body, encoding = asset.body, None
+        
+        # Each precompressed variant is a different representation with its own validator
+        etag = variant_etag(asset.etag, encoding)
+        headers = {
+            'Cache-Control': cache_control,
+            'ETag': etag,
+            'Last-Modified': asset.last_modified,
+            'Vary': 'Accept-Encoding'
+        }
+        
+        if self.is_not_modified(etag, asset.modified):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def is_not_modified(self, etag, mtime=None):
+        """Check the request's conditional headers against a validator."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            candidates = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and mtime is not None:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
     
-    def refresh_gameweek_data(self, gameweek):
-        """Refresh data for a specific gameweek."""
+    def refresh_gameweek_data(self, gameweek, with_awards=False):
+        """Refresh data for a specific gameweek, recalculating its awards in the same snapshot if asked."""
         try:
             print(f"Refreshing data for gameweek {gameweek}...")
             
@@ -345,8 +708,11 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                 }
                 teams_data.append(team_data)
             
-            # Save to database
-            db_manager.save_fpl_data(gameweek, teams_data)
+            # Save to database; only this step waits for other gameweeks' publishes
+            with db_manager.staging():
+                db_manager.save_fpl_data(gameweek, teams_data)
+                if with_awards:
+                    self.calculate_gameweek_awards(gameweek)
             
             print(f"Successfully refreshed data for gameweek {gameweek}")
             return True
@@ -396,8 +762,8 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
             print(f"Error calculating awards for gameweek {gameweek}: {e}")
             return False
     
-    def fetch_player_data_for_gameweek(self, gameweek):
-        """Fetch player performance data for all teams in a gameweek."""
+    def fetch_player_data_for_gameweek(self, gameweek, with_awards=False):
+        """Fetch player performance data for all teams in a gameweek, then recalculate awards if asked."""
         try:
             print(f"Fetching player data for gameweek {gameweek}...")
             
@@ -410,6 +776,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
             total_teams = len(teams)
             successful_fetches = 0
             
+            fetched = []
             for i, team in enumerate(teams):
                 team_id = team['team_id']
                 team_name = team['team_name']
@@ -424,7 +791,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                         for pick in picks['picks']:
                             # Get actual player performance data for this gameweek
                             player_performance = fpl_api.get_player_performance(pick['element'], gameweek)
-                            
+                        
                             # Basic debug logging for first player of first team
                             if i == 0:
                                 print(f"    Debug: Processing first player of first team")
@@ -438,7 +805,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                                         print(f"    Debug: history count: {len(player_performance['history'])}")
                                         if player_performance['history']:
                                             print(f"    Debug: first history entry: {player_performance['history'][0]}")
-                            
+                        
                             # Extract points from player performance data
                             gw_points = 0
                             if player_performance and 'history' in player_performance:
@@ -447,7 +814,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                                     if history_entry.get('round') == gameweek:
                                         gw_points = history_entry.get('total_points', 0)
                                         break
-                                
+                            
                                 # Additional debug logging
                                 if i == 0 and len(players_data) == 0:
                                     print(f"    Debug: extracted points: {gw_points}")
@@ -456,7 +823,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                                 if i == 0 and len(players_data) == 0:
                                     print(f"    Debug: Failed to get player performance data")
                                     print(f"    Debug: player_performance: {player_performance}")
-                            
+                        
                             player_data = {
                                 'player_id': pick['element'],
                                 'position': pick['position'],
@@ -464,7 +831,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                                 'gw_points': gw_points,
                                 'chips_used': pick.get('chip', '')
                             }
-                            
+                        
                             # Get player name and type from bootstrap data
                             player_info = self.get_player_info(pick['element'])
                             if player_info:
@@ -474,14 +841,10 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                                 # Fallback if we can't get player info
                                 player_data['player_name'] = f"Player {pick['element']}"
                                 player_data['element_type'] = 1  # Default to GKP
-                            
-                            players_data.append(player_data)
                         
-                        # Store in database
-                        print(f"  About to call db_manager.save_player_performance for {team_name}")
-                        db_manager.save_player_performance(gameweek, team_id, players_data)
-                        print(f"  ✓ Saved {len(players_data)} players for {team_name}")
-                        successful_fetches += 1
+                            players_data.append(player_data)
+                    
+                        fetched.append((team_id, team_name, players_data))
                     else:
                         print(f"  ⚠ No picks data for {team_name}")
                 
@@ -493,6 +856,18 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                 if i < total_teams - 1:  # Don't wait after the last team
                     import time
                     time.sleep(2)  # 2 second delay between teams (increased due to more API calls)
+
+            # Publish every team's picks together; the rate-limited fetches above hold no publish lock
+            with db_manager.staging():
+                for team_id, team_name, players_data in fetched:
+                    try:
+                        db_manager.save_player_performance(gameweek, team_id, players_data)
+                        print(f"  ✓ Saved {len(players_data)} players for {team_name}")
+                        successful_fetches += 1
+                    except Exception as e:
+                        print(f"  ❌ Error saving {team_name}: {e}")
+                if with_awards and successful_fetches:
+                    self.calculate_gameweek_awards(gameweek)
             
             print(f"Player data fetch complete: {successful_fetches}/{total_teams} teams processed successfully")
             return successful_fetches > 0
@@ -520,20 +895,11 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
     
     def check_player_data_availability(self, gameweek):
         """Check availability of player performance data."""
-        try:
-            with db_manager.get_connection() as conn:
-                c = conn.cursor()
-                c.execute('''SELECT COUNT(*) FROM player_performance WHERE gameweek = ?''', (gameweek,))
-                count = c.fetchone()[0]
-                
-                return {
-                    'available': count > 0,
-                    'count': count
-                }
-        
-        except Exception as e:
-            print(f"Error checking player data availability: {e}")
-            return {'available': False, 'count': 0}
+        count = read_model.player_count(gameweek)
+        return {
+            'available': count > 0,
+            'count': count
+        }
     
     def bulk_fetch_player_data(self, gameweek):
         """Bulk fetch player performance data for all teams."""
@@ -547,6 +913,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                 return False
             
             # Fetch player data for each team
+            fetched = []
             for team in teams:
                 team_id = team['team_id']
                 print(f"Fetching player data for team {team['team_name']} (ID: {team_id})")
@@ -555,7 +922,7 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                 team_details = fpl_api.get_team_details(team_id, gameweek)
                 if team_details and 'picks' in team_details:
                     picks = team_details['picks']
-                    
+                
                     # Process and save player data
                     players_data = []
                     for pick in picks:
@@ -569,13 +936,17 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
                             'chips_used': team_details.get('active_chip', '')
                         }
                         players_data.append(player_data)
-                    
-                    # Save to database
-                    db_manager.save_player_performance(gameweek, team_id, players_data)
-                    print(f"Saved player data for {len(players_data)} players")
+                
+                    fetched.append((team_id, players_data))
                 
                 else:
                     print(f"No player data found for team {team['team_name']}")
+
+            # Publish every team's picks together; the fetches above hold no publish lock
+            with db_manager.staging():
+                for team_id, players_data in fetched:
+                    db_manager.save_player_performance(gameweek, team_id, players_data)
+                    print(f"Saved player data for {len(players_data)} players")
             
             print(f"Successfully bulk fetched player data for gameweek {gameweek}")
             return True
@@ -588,145 +959,70 @@ class FPLRequestHandler(BaseHTTPRequestHandler):
         """Override to reduce logging noise."""
         pass
 
-    def get_simple_data(self, gameweek):
-        """Get FPL data with awards directly from database."""
+    def get_simple_data(self, gameweek, compact=False):
+        """Get FPL data with awards from the in-memory read model, as a cached response."""
         try:
-            import sqlite3
-            
-            # Get team data
-            conn = sqlite3.connect('fpl_history.db')
-            c = conn.cursor()
-            
-            # Get teams
-            c.execute('''SELECT team_id, team_name, manager_name, gw_points, total_points, team_value, bank_balance
-                         FROM fpl_data WHERE gameweek = ?''', (gameweek,))
-            teams_data = c.fetchall()
-            
-            if not teams_data:
-                conn.close()
-                return None
-            
-            teams = []
-            for row in teams_data:
-                teams.append({
-                    'team_id': row[0],
-                    'team_name': row[1], 
-                    'manager_name': row[2],
-                    'gw_points': row[3],
-                    'total_points': row[4],
-                    'team_value': row[5],
-                    'bank_balance': row[6],
-                    'overall_rank': 1,  # Will be calculated
-                    'rank_change': 0,
-                    'awards': []  # Will be populated
-                })
-            
-            # Sort by total points and assign ranks
-            teams = sorted(teams, key=lambda x: x['total_points'], reverse=True)
-            current_rank = 1
-            for i, team in enumerate(teams):
-                if i > 0 and team['total_points'] < teams[i-1]['total_points']:
-                    current_rank = i + 1
-                team['overall_rank'] = current_rank
-            
-            # Calculate rank changes from previous gameweek
-            if gameweek > 1:
-                c.execute('''SELECT team_id, total_points FROM fpl_data WHERE gameweek = ?''', (gameweek - 1,))
-                prev_data = c.fetchall()
-                prev_teams = []
-                for row in prev_data:
-                    prev_teams.append({'team_id': row[0], 'total_points': row[1]})
-                
-                # Sort previous teams and assign ranks
-                prev_teams = sorted(prev_teams, key=lambda x: x['total_points'], reverse=True)
-                prev_rank = 1
-                for i, prev_team in enumerate(prev_teams):
-                    if i > 0 and prev_team['total_points'] < prev_teams[i-1]['total_points']:
-                        prev_rank = i + 1
-                    prev_team['overall_rank'] = prev_rank
-                
-                # Create mapping for previous ranks
-                prev_ranks = {team['team_id']: team['overall_rank'] for team in prev_teams}
-                
-                # Calculate rank changes
-                for team in teams:
-                    if team['team_id'] in prev_ranks:
-                        team['rank_change'] = prev_ranks[team['team_id']] - team['overall_rank']
-                    else:
-                        team['rank_change'] = 0
-            
-            # Get awards from database
-            c.execute('''SELECT award_type, team_id, team_name, manager_name, points
-                         FROM award_winners WHERE gameweek = ?''', (gameweek,))
-            awards_data = c.fetchall()
-            
-            # Create team_id to awards mapping
-            team_awards = {}
-            award_emojis = {
-                'weekly_champion': '👑',
-                'wooden_spoon': '🥄', 
-                'performance_of_week': '🚀',
-                'the_wall': '🧱',
-                'benchwarmer': '🪑',
-                'captain_fantastic': '⭐'
-            }
-            award_colors = {
-                'weekly_champion': 'bg-yellow-400 text-white border-yellow-300',
-                'wooden_spoon': 'bg-red-500 text-white border-red-300',
-                'performance_of_week': 'bg-indigo-500 text-white border-indigo-300',
-                'the_wall': 'bg-green-500 text-white border-green-300',
-                'benchwarmer': 'bg-purple-500 text-white border-purple-300',
-                'captain_fantastic': 'bg-slate-800 text-white border-slate-600'
-            }
-            
-            for award_type, team_id, team_name, manager_name, points in awards_data:
-                if team_id not in team_awards:
-                    team_awards[team_id] = []
-                
-                team_awards[team_id].append({
-                    'type': award_type,
-                    'emoji': award_emojis.get(award_type, '🏆'),
-                    'color': award_colors.get(award_type, 'bg-gray-300 text-gray-800 border-gray-200'),
-                    'text': award_type.replace('_', ' ').title()
-                })
-            
-            # Attach awards to teams
-            for team in teams:
-                team['awards'] = team_awards.get(team['team_id'], [])
-            
-            conn.close()
-            
-            # Create awards summary for frontend
-            awards_summary = {}
-            for award_type, team_id, team_name, manager_name, points in awards_data:
-                if award_type not in awards_summary:
-                    awards_summary[award_type] = []
-                awards_summary[award_type].append({
-                    'team_id': team_id,
-                    'team_name': team_name,
-                    'manager_name': manager_name,
-                    'points': points
-                })
-            
-            print(f"Successfully processed data for gameweek {gameweek}")
-            teams_with_awards = [t for t in teams if t.get('awards') and len(t['awards']) > 0]
-            print(f"Teams with awards: {len(teams_with_awards)}/{len(teams)}")
-            
-            return {
-                'standings': teams,
-                'awards': awards_summary
-            }
-            
+            return read_model.get_gameweek_response(gameweek, compact)
         except Exception as e:
             print(f"Error getting simple data for gameweek {gameweek}: {e}")
             return None
 
+class FPLHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server that can wait for in-flight requests before the process exits.
+
+    Request threads stay daemon threads so a stuck client cannot hold the
+    process open forever, but they are tracked so shutdown can join them
+    (and the ingest they may be running) for a bounded time.
+    """
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        self._requests_lock = threading.Lock()
+        self._requests = set()
+        super().__init__(*args, **kwargs)
+
+    def process_request_thread(self, request, client_address):
+        thread = threading.current_thread()
+        with self._requests_lock:
+            self._requests.add(thread)
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._requests_lock:
+                self._requests.discard(thread)
+
+    def drain(self, timeout):
+        """Wait up to timeout seconds for running requests; return how many are still running."""
+        # Event streams never end on their own; close them so clients reconnect elsewhere
+        event_broadcaster.close_all()
+        deadline = time.time() + timeout
+        with self._requests_lock:
+            running = list(self._requests)
+        for thread in running:
+            thread.join(max(0, deadline - time.time()))
+        remaining = sum(1 for thread in running if thread.is_alive())
+        if remaining:
+            print(f"{remaining} requests still running after {timeout}s, exiting anyway")
+        return remaining
+
+def create_server(port=8000, sock=None):
+    """Create the HTTP server, optionally on an already-listening socket."""
+    if sock is None:
+        httpd = FPLHTTPServer(('', port), FPLRequestHandler)
+    else:
+        # Pre-fork workers share the parent's listening socket
+        httpd = FPLHTTPServer(('', port), FPLRequestHandler, bind_and_activate=False)
+        httpd.socket = sock
+    return httpd
+
 def start_server(port=8000):
     """Start the HTTP server."""
-    server_address = ('', port)
-    httpd = HTTPServer(server_address, FPLRequestHandler)
+    httpd = create_server(port)
     print(f"Starting server on port {port}")
-    httpd.serve_forever()
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.drain(Config.WORKER_GRACEFUL_TIMEOUT)
 
 if __name__ == '__main__':
     start_server()
@@ -0,0 +1,61 @@
+import threading
+from contextlib import ExitStack
+from single_flight import SingleFlight
+
+# Operations that compute awards, which compare a gameweek with the one before it
+READS_PREVIOUS_GAMEWEEK = ('awards', 'refresh+awards', 'players+awards', 'import')
+
+class WriteCoordinator:
+    """Serialize mutations of a gameweek across threads.
+
+    Every write to a gameweek (standings refresh, import, player fetch, award
+    recalculation) runs under that gameweek's lock, so DELETE+INSERT sequences
+    never interleave. A request for an operation that is already queued or
+    running on the same gameweek joins it instead of repeating the work.
+    Operations fetch from upstream under these locks only, so different
+    gameweeks ingest in parallel; each wraps just its saves (and the awards
+    computed from them) in a db_manager.staging() block, which readers see
+    published all at once.
+    
+    Operations that calculate awards also hold the previous gameweek's lock.
+    Locks are always taken lowest gameweek first and before staging begins,
+    so two operations can never wait on each other.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gameweek_locks = {}
+        self._flight = SingleFlight()
+
+    def _lock_for(self, gameweek):
+        with self._lock:
+            lock = self._gameweek_locks.get(gameweek)
+            if lock is None:
+                lock = threading.RLock()
+                self._gameweek_locks[gameweek] = lock
+            return lock
+
+    def run(self, gameweek, operation, fn, *args, **kwargs):
+        """Run fn for a gameweek, merging with an identical queued or running request."""
+        return self._flight.do((gameweek, operation), self._run_locked,
+                               gameweek, operation, fn, *args, **kwargs)
+
+    def _gameweeks_for(self, gameweek, operation):
+        """Gameweeks whose locks an operation needs, lowest first."""
+        if gameweek is not None and gameweek > 1 and operation.split(':')[0] in READS_PREVIOUS_GAMEWEEK:
+            return [gameweek - 1, gameweek]
+        return [gameweek]
+
+    def _run_locked(self, gameweek, operation, fn, *args, **kwargs):
+        with ExitStack() as stack:
+            for locked in self._gameweeks_for(gameweek, operation):
+                stack.enter_context(self._lock_for(locked))
+            print(f"Write coordinator: {operation} for gameweek {gameweek}")
+            return fn(*args, **kwargs)
+
+    def is_busy(self, gameweek):
+        """True while any write for the gameweek is queued or running."""
+        return any(key[0] == gameweek for key in self._flight.in_flight())
+
+# Global write coordinator instance
+write_coordinator = WriteCoordinator()